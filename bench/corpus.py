@@ -0,0 +1,84 @@
+import json
+import random
+import eseries
+
+packages = ["0201", "0402", "0603", "0805", "1206", "1210"]
+manufacturers = ["YAGEO", "KEMET", "Vishay / Dale", "Panasonic", "Murata Electronics", "TDK", "Samsung Electro-Mechanics", "Bourns"]
+
+resistor_templates = [
+    "Thick Film Resistors - SMD {package} {value}ohm {tolerance}% {power}W {tempco}ppm",
+    "RES {value} OHM {tolerance}% {power}W {package}",
+    "Thin Film Resistors - SMD {power}W {value} Ohms {tolerance}% {tempco}ppm {package} AEC-Q200",
+    "Resistor {package} {value}Ω ±{tolerance}% {power}W",
+    "Thick Film Resistors - SMD {value}ohms {tolerance}% {package} rated {power}W pulse {pulse_power}W",
+]
+
+capacitor_templates = [
+    "Multilayer Ceramic Capacitors MLCC - SMD/SMT {package} {voltage}V {value}F {dielectric} {tolerance}%",
+    "CAP CER {value}F {voltage}V {dielectric} {package}",
+    "Ceramic Capacitor {value}F {tolerance}% {voltage}V {dielectric} {package} SMD",
+]
+
+power_by_package = {"0201": "1/20", "0402": "1/16", "0603": "1/10", "0805": "1/8", "1206": "1/4", "1210": "1/2"}
+# pulse rating of the descriptions with two powers
+pulse_power_by_package = {"0201": "1/16", "0402": "1/10", "0603": "1/8", "0805": "1/4", "1206": "1/2", "1210": "1"}
+
+def _scaled(value : float, scales : list) -> str:
+    for factor, scale in scales:
+        if value >= factor:
+            number = f"{value / factor:.3g}"
+            return number + scale
+    return f"{value:.3g}"
+
+def make_resistor(rnd : random.Random, index : int) -> dict:
+    base = float(rnd.choice(eseries.get_series(24)))
+    value = base * 10 ** rnd.randint(0, 6)
+    package = rnd.choice(packages)
+    description = rnd.choice(resistor_templates).format(
+        package=package, value=_scaled(value, [(1e6, "M"), (1e3, "K"), (1, "")]),
+        tolerance=rnd.choice(["1", "5", "0.1"]), power=power_by_package[package], pulse_power=pulse_power_by_package[package],
+        tempco=rnd.choice(["50", "100", "200"]))
+    return _part(rnd, index, description, "Thick Film Resistors - SMD")
+
+def make_capacitor(rnd : random.Random, index : int) -> dict:
+    base = float(rnd.choice(eseries.get_series(6)))
+    value = base * 10 ** rnd.randint(-12, -6)
+    description = rnd.choice(capacitor_templates).format(
+        package=rnd.choice(packages), value=_scaled(value, [(1e-6, "u"), (1e-9, "n"), (1e-12, "p")]),
+        voltage=rnd.choice(["6.3", "10", "16", "25", "50", "100"]), dielectric=rnd.choice(["X7R", "X5R", "C0G"]),
+        tolerance=rnd.choice(["5", "10", "20"]))
+    return _part(rnd, index, description, "Multilayer Ceramic Capacitors MLCC - SMD/SMT")
+
+def _part(rnd : random.Random, index : int, description : str, category : str) -> dict:
+    manufacturer = rnd.choice(manufacturers)
+    return {
+        "Availability": f"{rnd.randint(0, 500000)} In Stock",
+        "Category": category,
+        "DataSheetUrl": f"https://www.example.com/datasheets/{index}.pdf",
+        "Description": description,
+        "Manufacturer": manufacturer,
+        "ManufacturerPartNumber": f"SYN-{index:07d}",
+        "MouserPartNumber": f"000-SYN-{index:07d}",
+        "PriceBreaks": [{"Quantity": 1, "Price": f"${rnd.uniform(0.01, 1):.2f}", "Currency": "USD"},
+                        {"Quantity": 100, "Price": f"${rnd.uniform(0.001, 0.1):.3f}", "Currency": "USD"}],
+        "ROHSStatus": "RoHS Compliant",
+    }
+
+def synthetic_parts(count : int, seed : int = 0) -> list:
+    """
+    Returns `count` synthetic parts, half resistors and half MLCCs, shaped like the Parts of a Mouser response.
+    """
+    rnd = random.Random(seed)
+    return [make_resistor(rnd, i) if i % 2 == 0 else make_capacitor(rnd, i) for i in range(count)]
+
+def load_parts(path : str) -> list:
+    """
+    Loads a recorded corpus, one part JSON per line (like data_global.txt).
+    """
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def save_parts(parts : list, path : str):
+    with open(path, 'w') as f:
+        for part in parts:
+            f.write(json.dumps(part) + "\n")
@@ -0,0 +1,232 @@
+"""
+Benchmarks of the hot paths, without spending API quota.
+
+    python -m bench.run [--parts 20000] [--latency 0.05] [--error-rate 0] [--corpus data_global.txt]
+
+The end-to-end benchmarks run against bench.stub_server, a local stand-in of the Mouser API.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import eseries
+import mult
+import parallel
+import poc
+from bench.corpus import synthetic_parts, load_parts, save_parts
+from bench.stub_server import StubMouserServer
+from ratelimit import QuotaLimiter
+from records import PartRecord
+from table import AttributeTable, ValueIndex, around
+from store import PartStore
+
+fields = ["Description", "Manufacturer", "ManufacturerPartNumber", "Category", "DataSheetUrl"]
+
+specs = {
+    "capacitor": { "type" : "capacitor", "package" : "0603", "tolerance" : "10%", "voltage" : "16V", "value" : "100n" , "flags" : { "better_voltage_rating" : True } },
+    "resistor": { "type" : "resistor", "package" : "0603", "tolerance" : "1%", "power" : "1/10W", "value" : "2K7" , "flags" : { "better_power_rating" : True } },
+}
+
+def timed(name : str, count : int, unit : str, fn) -> dict:
+    """
+    Runs fn once and prints its rate. If count is None, fn returns the count.
+    """
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        returned = fn()
+    elapsed = time.perf_counter() - start
+    if count is None:
+        count = returned
+    result = {"name": name, "seconds": elapsed, "count": count, "rate": count / elapsed if elapsed else float('inf'), "unit": unit}
+    print(f"{name:<45} {result['rate']:>14,.0f} {unit}/s   ({count} in {elapsed:.3f}s)")
+    return result
+
+def bench_number_variants() -> list:
+    values = [(base, scale) for base in eseries.get_series(24) for scale in ('p', 'n', 'u', '', 'k', 'M')]
+
+    def cold():
+        for _ in range(10):
+            mult.compute_number_variants.cache_clear()
+            mult.build_number_scale_regex_options.cache_clear()
+            for base, scale in values:
+                mult.get_number_scale_regex_options(mult.get_number_variants_with_multi(base, scale))
+
+    def warm():
+        for _ in range(10):
+            for base, scale in values:
+                mult.get_number_scale_regex_options(mult.get_number_variants_with_multi(base, scale))
+
+    return [timed("get_number_variants_with_multi (cold)", 10 * len(values), "values", cold),
+            timed("get_number_variants_with_multi (warm)", 10 * len(values), "values", warm)]
+
+def bench_search_patterns() -> list:
+    count = 2000
+    saved_spec_cache = poc.spec_cache
+    poc.spec_cache = None
+
+    def cold():
+        #the specs are remembered by spec_hash, forget them so every one is calculated
+        for i in range(count):
+            poc.calculated_specs.clear()
+            poc.calculate_search_patterns(dict(specs["capacitor"] if i % 2 else specs["resistor"]))
+
+    def warm():
+        for i in range(count):
+            poc.calculate_search_patterns(dict(specs["capacitor"] if i % 2 else specs["resistor"]))
+
+    try:
+        return [timed("calculate_search_patterns (cold)", count, "specs", cold),
+                timed("calculate_search_patterns (warm)", count, "specs", warm)]
+    finally:
+        poc.spec_cache = saved_spec_cache
+
+def bench_clenup(parts : list) -> list:
+    descriptions = [part.get("Description") or "" for part in parts]
+    results = []
+    for name, spec in specs.items():
+        params = dict(spec)
+        with contextlib.redirect_stdout(io.StringIO()):
+            poc.calculate_search_patterns(params)
+
+        def one_by_one():
+            for description in descriptions:
+                poc.clenup_description(params, description)
+
+        def batch():
+            params['compiled_spec'].filter(descriptions)
+
+        results.append(timed(f"clenup_description {name}", len(descriptions), "descriptions", one_by_one))
+        results.append(timed(f"CompiledSpec.filter {name}", len(descriptions), "descriptions", batch))
+    return results
+
+def bench_table(parts : list) -> list:
+    """
+    AttributeTable.spec_mask against CompiledSpec.check over the corpus. They must accept the same parts.
+    """
+    descriptions = [part.get("Description") or "" for part in parts]
+    table = AttributeTable.from_descriptions(descriptions)
+    results = []
+    for name, spec in specs.items():
+        params = dict(spec)
+        with contextlib.redirect_stdout(io.StringIO()):
+            compiled_spec = poc.calculate_search_patterns(params)
+
+        accepted = [failed is None for _, failed in compiled_spec.check_all(descriptions)]
+        mask = table.spec_mask(compiled_spec)
+        different = [description for description, a, b in zip(descriptions, accepted, mask.tolist()) if a != b]
+        if different:
+            raise AssertionError(f"spec_mask and check disagree on {len(different)} {name} descriptions, e.g. {different[0]!r}")
+
+        results.append(timed(f"AttributeTable.spec_mask {name}", len(descriptions), "descriptions",
+                             lambda: table.spec_mask(compiled_spec)))
+    return results
+
+def bench_parallel(parts : list) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.jsonl")
+        save_parts(parts, path)
+        params = dict(specs["capacitor"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            compiled_spec = poc.calculate_search_patterns(params)
+
+        for workers in sorted({1, os.cpu_count() or 1}):
+            results.append(timed(f"filter_jsonl_parallel ({workers} workers)", len(parts), "parts",
+                                 lambda: parallel.filter_jsonl_parallel(path, compiled_spec, fields, workers=workers)))
+    return results
+
+def bench_records(parts : list) -> list:
+    #records are built from decoded JSON, as from the API, so every part has its own strings
+    lines = [json.dumps(part) for part in parts]
+    results = []
+
+    def as_dict(part):
+        record = {field: part.get(field) for field in fields}
+        record["Description"] = part.get("Description")
+        return record
+
+    def as_record(part):
+        return PartRecord.from_part(part, fields, part.get("Description"))
+
+    for name, build in (("dict", as_dict), ("PartRecord", as_record)):
+        tracemalloc.start()
+        records = [build(json.loads(line)) for line in lines]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{name + ' records':<45} {size / len(records):>14,.0f} bytes/record ({len(records)} records)")
+        results.append({"name": f"{name} records", "bytes_per_record": size / len(records)})
+        del records
+    return results
+
+def bench_index(parts : list) -> list:
+    table = AttributeTable.from_parts(parts)
+    index = ValueIndex(table)
+    index.query('resistor', '0603', value=around(2700, 0.05))  #build the sorted group outside the timing
+    count = 1000
+
+    def scan():
+        for _ in range(count):
+            table.compare('value', 'within', 2700, 0.05) & table.compare('power', 'ge', 0.1) & \
+                table.word_mask(table.type, table.types, 'resistor') & table.word_mask(table.package, table.packages, '0603')
+
+    def indexed():
+        for _ in range(count):
+            index.query('resistor', '0603', value=around(2700, 0.05), power=(0.1, None))
+
+    return [timed("range query (full column scan)", count, "queries", scan),
+            timed("range query (ValueIndex)", count, "queries", indexed)]
+
+def bench_end_to_end(parts : list, latency : float, error_rate : float) -> list:
+    results = []
+    saved = (poc.api_base_url, poc.rate_limiter, poc.part_store)
+
+    with tempfile.TemporaryDirectory() as tmp, StubMouserServer(parts, latency=latency, error_rate=error_rate) as stub:
+        poc.api_base_url = stub.base_url
+        poc.rate_limiter = QuotaLimiter(per_minute=10 ** 9, per_day=10 ** 9, path=None)
+        poc.part_store = PartStore(os.path.join(tmp, "parts.db"))
+        try:
+            for name, spec in specs.items():
+                first_call = poc.metrics.api_calls
+                results.append(timed(f"get_filtered_components {name}", None, "records",
+                                     lambda: len(poc.get_filtered_components("bench", dict(spec), 200, fields))))
+                print(f"{'':<45} {poc.metrics.api_calls - first_call} api calls")
+
+                first_call = poc.metrics.api_calls
+                results.append(timed(f"get_filtered_components_concurrent {name}", None, "records",
+                                     lambda: len(poc.get_filtered_components_concurrent("bench", dict(spec), 200, fields, concurrency=8))))
+                print(f"{'':<45} {poc.metrics.api_calls - first_call} api calls")
+            print(f"stub: {stub.requests} requests, {stub.throttled} throttled")
+        finally:
+            poc.part_store.close()
+            poc.api_base_url, poc.rate_limiter, poc.part_store = saved
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the hot paths against a local stand-in of the Mouser API")
+    parser.add_argument("--parts", type=int, default=20000, help="size of the synthetic corpus")
+    parser.add_argument("--corpus", help="recorded corpus (one part JSON per line) used instead of the synthetic one")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every stub response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 429 from the stub")
+    args = parser.parse_args()
+
+    parts = load_parts(args.corpus) if args.corpus else synthetic_parts(args.parts)
+    print(f"corpus: {len(parts)} parts")
+
+    bench_number_variants()
+    bench_search_patterns()
+    bench_clenup(parts)
+    bench_table(parts)
+    bench_parallel(parts)
+    bench_records(parts)
+    bench_index(parts)
+    bench_end_to_end(parts, args.latency, args.error_rate)
+
+#main
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubMouserServer:
+    """
+    Local stand-in of the Mouser keyword search API, serving a corpus of parts.
+
+    POST /api/v2/search/keyword answers with the corpus parts whose description has at least
+    `match_ratio` of the words of the keyword (case insensitive), as the real search is not exact,
+    paged with records/startingRecord like the real API.
+
+    Args:
+        parts (list): The corpus of parts.
+        latency (float): Seconds added to every response.
+        error_rate (float): Probability of answering 429 Too Many Requests.
+        retry_after (int): Retry-After header sent with the 429 responses.
+        port (int): Port to listen on, 0 for any free port.
+        match_ratio (float): Fraction of the keyword words a description must have.
+    """
+    def __init__(self, parts : list, latency : float = 0.0, error_rate : float = 0.0, retry_after : int = 1, port : int = 0, match_ratio : float = 0.5):
+        self.parts = parts
+        self.match_ratio = match_ratio
+        self.descriptions = [(part.get("Description") or "").lower().replace(",", "") for part in parts]
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.throttled = 0
+        self.random = random.Random(0)
+        self.results = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/api/v2"
+
+    def search(self, keyword : str) -> list:
+        #every page of a keyword is the same search, so the stub itself does not dominate the numbers
+        found = self.results.get(keyword)
+        if found is None:
+            words = keyword.lower().split()
+            needed = max(1, int(len(words) * self.match_ratio + 0.5))
+            found = [part for part, description in zip(self.parts, self.descriptions) if sum(word in description for word in words) >= needed]
+            self.results[keyword] = found
+        return found
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status : int, body : dict, headers : dict = None):
+                raw = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                with stub.lock:
+                    stub.requests += 1
+                    throttle = stub.random.random() < stub.error_rate
+                    if throttle:
+                        stub.throttled += 1
+                if throttle:
+                    self._send(429, {"Errors": [{"Code": "TooManyRequests", "Message": "Too many requests"}]}, {"Retry-After": str(stub.retry_after)})
+                    return
+
+                if not self.path.startswith("/api/v2/search/keyword"):
+                    self._send(404, {"Errors": [{"Code": "NotFound", "Message": self.path}]})
+                    return
+
+                request = payload.get("SearchByKeywordRequest", {})
+                found = stub.search(request.get("keyword", ""))
+                start = request.get("startingRecord", 0)
+                records = request.get("records", 50)
+                self._send(200, {"Errors": [], "SearchResults": {"NumberOfResult": len(found), "Parts": found[start:start + records]}})
+
+        return Handler
+
+    def start(self) -> 'StubMouserServer':
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,111 @@
+import poc
+from lazy import lazy_import
+from ratelimit import QuotaExceeded
+from records import PartRecord
+
+# only imported when the first call is made
+requests = lazy_import("requests")
+
+def plan_bom(specs : list) -> tuple:
+    """
+    Compiles the BOM lines and merges their keywords.
+
+    Args:
+        specs (list): The component params dict of every BOM line.
+
+    Returns:
+        tuple: (compiled, keywords, errors) where compiled has the CompiledSpec of every line (None for invalid
+            lines), keywords maps every distinct keyword, in order, to the indexes of the lines that asked for it,
+            and errors has why every invalid line can not be searched (None for the valid ones).
+    """
+    compiled = []
+    keywords = {}
+    errors = []
+
+    for line_idx, component_params in enumerate(specs):
+        error = poc.search_params_error(component_params)
+        compiled_spec = None if error else poc.calculate_search_patterns(component_params)
+        if not compiled_spec:
+            error = error or "the spec patterns can not be calculated"
+            print(f"Invalid component params in BOM line {line_idx}: {error}")
+            compiled.append(None)
+            errors.append(error)
+            continue
+        compiled.append(compiled_spec)
+        errors.append(None)
+
+        for keyword in poc.get_keywords_from_params(component_params):
+            #the same keyword written differently is the same search
+            keyword = " ".join(keyword.split())
+            keywords.setdefault(keyword, []).append(line_idx)
+
+    return compiled, keywords, errors
+
+def resolve_bom(api_key, specs : list, total_occurrences, fields, cache = None, refresh : bool = False) -> list:
+    """
+    Resolves a whole BOM in one planned fetch pass.
+
+    All lines are compiled first and their keywords merged, so each distinct keyword/page is fetched
+    at most once. Invalid lines are left unresolved, with the reason in errors, and the other lines
+    are resolved as usual. Every returned part is checked against all the lines still missing records, not
+    only the ones that asked for the keyword, and a keyword stops being paged as soon as the lines
+    that asked for it have their records.
+
+    Args:
+        api_key (str): The API key to access the electronic components data.
+        specs (list): The component params dict of every BOM line.
+        total_occurrences (int): The number of records wanted for each line.
+        fields (list): The fields to include in the returned data.
+        cache (ResponseCache): Optional response cache.
+        refresh (bool): If True, cached pages are fetched again and the cache is updated.
+
+    Returns:
+        tuple: (results, errors) where results has, for every BOM line, a list of dictionaries, where each
+            dictionary contains data for a component, and errors has why every unresolved line can not
+            be searched (None for the valid ones).
+    """
+    records_per_request = 50
+    compiled, keywords, errors = plan_bom(specs)
+    print(f"BOM: {len(specs)} lines, {len(keywords)} distinct keywords")
+
+    results = [[] for _ in specs]
+    seen = [set() for _ in specs]
+
+    def done(line_idx):
+        return compiled[line_idx] is None or len(results[line_idx]) >= total_occurrences
+
+    first_call = poc.metrics.api_calls
+    for keyword, line_idxs in keywords.items():
+        starting_record = 0
+        while not all(done(line_idx) for line_idx in line_idxs):
+            try:
+                data = poc.search_component(api_key, keyword, records_per_request, starting_record, cache=cache, refresh=refresh)
+            except requests.exceptions.RequestException as e:
+                print( f"HTTP error:  {e} api calls {poc.metrics.api_calls}")
+                return results, errors
+            except QuotaExceeded as e:
+                print( f"{e} api calls {poc.metrics.api_calls}")
+                return results, errors
+
+            total_results = data.get("SearchResults", {}).get("NumberOfResult", 0)
+            parts = data.get("SearchResults", {}).get("Parts", [])
+
+            for line_idx, compiled_spec in enumerate(compiled):
+                if done(line_idx):
+                    continue
+                for part, description_cleaned in zip(parts, compiled_spec.filter(part.get("Description") for part in parts)):
+                    key = (part.get("ManufacturerPartNumber"), part.get("Manufacturer"))
+                    if description_cleaned is None or key in seen[line_idx]:
+                        continue
+                    seen[line_idx].add(key)
+                    results[line_idx].append(PartRecord.from_part(part, fields, description_cleaned))
+                    if done(line_idx):
+                        break
+
+            starting_record += records_per_request
+            if starting_record >= total_results:
+                #no more records with the given keyword
+                break
+
+    print(f"BOM resolved with {poc.metrics.api_calls - first_call} api calls")
+    return results, errors
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+
+default_cache_path = 'mouser_cache.db'
+
+class ResponseCache:
+    """
+    Persistent on-disk cache for Mouser API responses.
+
+    Responses are stored in a SQLite file, keyed by a hash of the normalized request payload
+    (the api key is never part of the key). Entries expire after `ttl` seconds, or `empty_ttl`
+    seconds for responses without parts, so a keyword that had no stock can be retried sooner.
+    When the cache grows over `max_entries` or `max_bytes` the least recently used entries are evicted.
+
+    Args:
+        path (str): The SQLite file used to persist the cache.
+        ttl (int): Seconds a response with parts stays valid.
+        empty_ttl (int): Seconds a response without parts stays valid. Defaults to `ttl`.
+        max_entries (int): Maximum number of cached responses. None for no limit.
+        max_bytes (int): Maximum total size of the cached responses. None for no limit.
+    """
+    def __init__(self, path : str = default_cache_path, ttl : int = 24 * 3600, empty_ttl : int = None, max_entries : int = 10000, max_bytes : int = None):
+        self.path = path
+        self.ttl = ttl
+        self.empty_ttl = ttl if empty_ttl is None else empty_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                expires REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(payload : dict) -> str:
+        """
+        Returns the cache key of a request payload.
+
+        The keyword is lowercased and its whitespace collapsed, so "1u  20% capacitor" and
+        "1U 20% Capacitor" share the same entry. The rest of the payload is serialized with sorted keys.
+        """
+        payload = json.loads(json.dumps(payload))
+        request = payload.get("SearchByKeywordRequest")
+        if request and isinstance(request.get("keyword"), str):
+            request["keyword"] = " ".join(request["keyword"].lower().split())
+        raw = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, payload : dict):
+        """
+        Returns the cached response for the payload, or None if there is no valid entry.
+        """
+        key = self.make_key(payload)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT data, expires FROM responses WHERE key = ?", (key,)).fetchone()
+
+            if row is None or row[1] < now:
+                self.misses += 1
+                return None
+
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def peek(self, payload : dict):
+        """
+        Same as get, but without counting a hit or a miss or touching the entry, for estimations.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT data, expires FROM responses WHERE key = ?", (self.make_key(payload),)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def put(self, payload : dict, data : dict):
+        """
+        Stores a response and evicts the least recently used entries if the cache is over its limits.
+        """
+        key = self.make_key(payload)
+        now = time.time()
+        raw = json.dumps(data)
+        parts = (data.get("SearchResults") or {}).get("Parts") or []
+        ttl = self.ttl if parts else self.empty_ttl
+
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO responses (key, data, size, created, expires, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                              (key, raw, len(raw), now, now + ttl, now))
+            self.evict()
+            self.conn.commit()
+
+    def evict(self):
+        """
+        Removes expired entries and then the least recently used ones until the cache fits its limits.
+        """
+        cur = self.conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+        self.evictions += cur.rowcount
+
+        if self.max_entries is not None:
+            cur = self.conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )""", (self.max_entries,))
+            self.evictions += cur.rowcount
+
+        if self.max_bytes is not None:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                to_delete = []
+                for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+                    if total <= self.max_bytes:
+                        break
+                    to_delete.append((key,))
+                    total -= size
+                self.conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+                self.evictions += len(to_delete)
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+    def stats(self) -> dict:
+        entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": entries, "bytes": size}
+
+    def close(self):
+        self.conn.close()
+
+default_spec_cache_path = '.spec_cache'
+
+# bump when what calculate_search_patterns stores changes, so old entries are not used
+spec_cache_version = 1
+
+class SpecCache:
+    """
+    On-disk cache of what `poc.calculate_search_patterns` calculates for a spec (the number variants,
+    the regexes and the CompiledSpec), one pickle file per spec hash.
+
+    Runs that only hit the response cache, or search offline, then start without calculating the spec again.
+    Unreadable or old entries are ignored and calculated again.
+
+    Args:
+        path (str): The directory of the cache files.
+    """
+    def __init__(self, path : str = default_spec_cache_path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key : str) -> str:
+        return os.path.join(self.path, f"{key}.v{spec_cache_version}.pickle")
+
+    def get(self, key : str) -> dict:
+        try:
+            with open(self._file(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+    def put(self, key : str, calculated : dict):
+        fd, tmp_path = tempfile.mkstemp(prefix='.spec-', dir=self.path)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(calculated, f)
+            os.replace(tmp_path, self._file(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import time
+from records import json_default
+
+default_checkpoint_path = 'search.checkpoint.json'
+
+class Checkpoint:
+    """
+    Durable state of a keyword search, so a search stopped by the daily quota can go on where it was.
+
+    The state is a JSON file with the spec (and its hash), the keyword list, the cursor
+    (kw_idx, starting_record) of the next page to fetch, and the records accepted so far. It only
+    exists while a search is unfinished: the search removes it when it completes. It is written
+    atomically (temporary file + rename), so a crash while saving leaves the previous state intact.
+
+    Args:
+        path (str): The checkpoint file.
+    """
+    def __init__(self, path : str = default_checkpoint_path):
+        self.path = path
+
+    def load(self) -> dict:
+        """
+        Returns the saved state, or None if there is none (or it can not be read).
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def load_for(self, spec_hash : str, keyword_list : list, total_occurrences : int, fields : list) -> dict:
+        """
+        Returns the saved state if it belongs to the same search (spec, keywords, total and fields), None otherwise.
+        """
+        state = self.load()
+        if state is None:
+            return None
+        if state.get("spec_hash") != spec_hash or state.get("keyword_list") != list(keyword_list):
+            print(f"Checkpoint {self.path} is for another search, starting over")
+            return None
+        if state.get("total_occurrences") != total_occurrences or state.get("fields") != list(fields):
+            print(f"Checkpoint {self.path} is for another total or other fields, starting over")
+            return None
+        return state
+
+    def save(self, state : dict):
+        state = dict(state, updated=time.time())
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.checkpoint-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, default=json_default)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
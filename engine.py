@@ -0,0 +1,55 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+class FetchEngine:
+    """
+    Runs keyword/page fetches concurrently.
+
+    The engine wraps a blocking `fetch(keyword, starting_record)` function (normally a call to
+    `poc.search_component` sharing a pooled session and the quota limiter) and runs up to
+    `concurrency` calls at a time on a thread pool, driven by asyncio.
+
+    Pages are scheduled in a window: the first page of every keyword is queued, and when it
+    returns, the remaining pages of that keyword (known from NumberOfResult) are queued right
+    after it. Results are yielded in scheduling order, so the consumer sees the same ordering on
+    every run, and can stop at any time, which cancels the pages not started yet.
+
+    Args:
+        fetch (callable): Blocking function fetch(keyword, starting_record) -> response dict.
+        concurrency (int): Maximum number of requests in flight.
+    """
+    def __init__(self, fetch, concurrency : int = 8):
+        self.fetch = fetch
+        self.concurrency = concurrency
+
+    async def iter_pages(self, keyword_list : list, records_per_request : int):
+        """
+        Yields (kw_idx, starting_record, data) for every page of every keyword.
+        """
+        loop = asyncio.get_running_loop()
+        jobs = deque((kw_idx, 0) for kw_idx in range(len(keyword_list)))
+        pending = deque()
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            while jobs or pending:
+                while jobs and len(pending) < self.concurrency:
+                    kw_idx, starting_record = jobs.popleft()
+                    future = loop.run_in_executor(executor, self.fetch, keyword_list[kw_idx], starting_record)
+                    pending.append((kw_idx, starting_record, future))
+
+                kw_idx, starting_record, future = pending.popleft()
+                data = await future
+
+                if starting_record == 0:
+                    total_results = data.get("SearchResults", {}).get("NumberOfResult", 0)
+                    more = range(records_per_request, total_results, records_per_request)
+                    jobs.extendleft((kw_idx, start) for start in reversed(more))
+
+                yield kw_idx, starting_record, data
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+            # do not wait for requests already on the wire
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,15 @@
+# E24 (and so E12 and E6) does not follow the formula, the values are fixed by IEC 60063
+e24_values = ['1.0', '1.1', '1.2', '1.3', '1.5', '1.6', '1.8', '2.0', '2.2', '2.4', '2.7', '3.0',
+              '3.3', '3.6', '3.9', '4.3', '4.7', '5.1', '5.6', '6.2', '6.8', '7.5', '8.2', '9.1']
+
+def get_series(n : int) -> list:
+    """
+    Returns the base values (1 <= v < 10) of the E-series with n values per decade, as strings.
+    """
+    if n in (6, 12, 24):
+        return e24_values[::24 // n]
+    if n in (48, 96, 192):
+        values = [f"{round(10 ** (i / 192), 2):.2f}" for i in range(0, 192, 192 // n)]
+        #the only value of E192 that does not follow the formula
+        return ['9.20' if v == '9.19' else v for v in values]
+    raise ValueError(f"Invalid E-series E{n}")
@@ -0,0 +1,215 @@
+import csv
+import gzip
+import json
+from records import json_default
+
+class JsonlSink:
+    """
+    Writes records as JSON lines, flushing every record so the file can be read while a search is still running.
+
+    Args:
+        path (str): The file to write.
+        mode (str): 'w' to start a new file, 'a' to append to an existing one.
+    """
+    def __init__(self, path : str, mode : str = 'w'):
+        self.path = path
+        self.file = open(path, mode, encoding='utf-8')
+        self.count = 0
+
+    def write(self, record : dict):
+        self.file.write(json.dumps(record, ensure_ascii=False, default=json_default) + "\n")
+        self.file.flush()
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def column_value(value):
+    """
+    Value of a column cell: strings as they are, None as null, anything else (PriceBreaks...) as JSON.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=json_default)
+
+def record_fields(fields) -> list:
+    """
+    The columns of the records of a search: the requested fields, plus Description that every record has.
+    """
+    fields = list(fields)
+    if "Description" not in fields:
+        fields.append("Description")
+    return fields
+
+class CsvSink:
+    """
+    Writes records as CSV with one column per field, gzip compressed if the path ends with .gz.
+
+    Args:
+        path (str): The file to write.
+        fields (list): The fields of the records, the columns of the file.
+    """
+    def __init__(self, path : str, fields : list):
+        self.path = path
+        self.fields = record_fields(fields)
+        if path.endswith('.gz'):
+            self.file = gzip.open(path, 'wt', encoding='utf-8', newline='')
+        else:
+            self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.fields)
+        self.count = 0
+
+    def write(self, record : dict):
+        self.writer.writerow([column_value(record.get(field)) for field in self.fields])
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Arrow files need pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+class ArrowSink:
+    """
+    Writes records to a Parquet file, or an Arrow IPC file if the path ends with .arrow or .feather.
+
+    The schema has a string column per field (values that are not strings, like PriceBreaks, are
+    stored as JSON), so readers can load only the columns they need. Records are buffered and
+    written in batches of `batch_size` rows. pyarrow is only imported when this sink is used.
+
+    Args:
+        path (str): The file to write.
+        fields (list): The fields of the records, the columns of the file.
+        batch_size (int): Rows per written batch (Parquet row group).
+    """
+    def __init__(self, path : str, fields : list, batch_size : int = 10000):
+        pa = _pyarrow()
+        self.pa = pa
+        self.path = path
+        self.fields = record_fields(fields)
+        self.batch_size = batch_size
+        self.schema = pa.schema([(field, pa.string()) for field in self.fields])
+        self.columns = {field: [] for field in self.fields}
+        self.pending = 0
+        self.count = 0
+
+        if path.endswith(('.arrow', '.feather')):
+            self.writer = pa.ipc.new_file(path, self.schema)
+        else:
+            self.writer = pa.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, record : dict):
+        for field in self.fields:
+            self.columns[field].append(column_value(record.get(field)))
+        self.pending += 1
+        self.count += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        batch = self.pa.record_batch([self.pa.array(self.columns[field], type=self.pa.string()) for field in self.fields], schema=self.schema)
+        if isinstance(self.writer, self.pa.parquet.ParquetWriter):
+            self.writer.write_table(self.pa.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+        self.columns = {field: [] for field in self.fields}
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def file_format(path : str) -> str:
+    """
+    Returns the format of a file from its name: jsonl, csv, parquet or arrow.
+    """
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    for suffix, format in (('.csv', 'csv'), ('.parquet', 'parquet'), ('.arrow', 'arrow'), ('.feather', 'arrow')):
+        if name.endswith(suffix):
+            return format
+    return 'jsonl'
+
+def open_sink(path : str, fields : list):
+    """
+    Returns a sink for the file, chosen by its extension: .csv / .csv.gz, .parquet, .arrow / .feather, or JSON lines otherwise.
+    """
+    format = file_format(path)
+    if format == 'csv':
+        return CsvSink(path, fields)
+    if format in ('parquet', 'arrow'):
+        return ArrowSink(path, fields)
+    return JsonlSink(path)
+
+def write_records(records, path : str, fields : list) -> int:
+    """
+    Writes records (or parts, e.g. PartStore.iter_parts()) to a file in the format of its extension. Returns the number written.
+    """
+    with open_sink(path, fields) as sink:
+        for record in records:
+            sink.write(record)
+        return sink.count
+
+def read_records(path : str, columns : list = None):
+    """
+    Yields the records of a file written by one of the sinks, as dicts.
+
+    With `columns`, only those are read; Parquet and Arrow files then do not even load the others,
+    and Arrow files are memory mapped. CSV and Parquet/Arrow cells are returned as strings (JSON for
+    the values that were not strings).
+    """
+    format = file_format(path)
+
+    if format == 'csv':
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                yield {column: row.get(column) for column in columns} if columns else row
+
+    elif format in ('parquet', 'arrow'):
+        pa = _pyarrow()
+        if format == 'parquet':
+            table = pa.parquet.read_table(path, columns=columns, memory_map=True)
+        else:
+            table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+            if columns:
+                table = table.select(columns)
+        for batch in table.to_batches():
+            yield from batch.to_pylist()
+
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                yield {column: record.get(column) for column in columns} if columns else record
@@ -0,0 +1,100 @@
+import re
+from decimal import Decimal
+from typing import NamedTuple
+import mult
+
+class Attribute(NamedTuple):
+    """
+    An attribute found in a part description.
+
+    kind is one of value, power, voltage, tolerance, tempco, type or package. For the numeric
+    kinds, number/scale/unit are the parsed pieces (scale and unit normalized, for example 'u' and 'F')
+    and value is the number in base SI units (Decimal). start/end is the span in the scanned text.
+    """
+    kind : str
+    start : int
+    end : int
+    text : str
+    number : str = None
+    scale : str = ''
+    unit : str = ''
+    value : Decimal = None
+
+# standard unit and attribute kind of each unit spelling, matched case insensitive
+unit_spellings = {
+    'Ω': ('Ω', 'value'), 'ω': ('Ω', 'value'), 'Ω': ('Ω', 'value'), 'ohm': ('Ω', 'value'), 'ohms': ('Ω', 'value'),
+    'f': ('F', 'value'), 'farad': ('F', 'value'), 'farads': ('F', 'value'),
+    'h': ('H', 'value'), 'henry': ('H', 'value'), 'henries': ('H', 'value'), 'henrys': ('H', 'value'),
+    'w': ('W', 'power'), 'watt': ('W', 'power'), 'watts': ('W', 'power'),
+    'v': ('V', 'voltage'), 'volt': ('V', 'voltage'), 'volts': ('V', 'voltage'),
+    '%': ('%', 'tolerance'),
+    'ppm': ('ppm', 'tempco'),
+}
+
+type_words = ["resistor", "capacitor", "inductor", "connector", "switch", "diode", "transistor", "crystal", "oscillator", "fuse", "relay", "transformer", "sensor"]
+package_codes = ["01005", "0201", "0402", "0603", "0805", "1008", "1206", "1210", "1806", "1812", "2010", "2220", "2512"]
+package_families = ["sot", "sod", "soic", "tssop", "msop", "ssop", "qfn", "dfn", "lqfp", "tqfp", "qfp", "bga", "dip", "sma", "smb", "smc", "to"]
+
+def _alternatives(words) -> str:
+    #longest first, so "ohms" is not matched as "ohm"
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+_scales = _alternatives(mult.scale_aliases)
+_units = _alternatives(unit_spellings)
+
+# one pattern for everything, so each description is walked only once
+attribute_pattern = re.compile(rf"""
+    (?<![\w.])
+    (?:
+        # 2K7, 4n7, 4R7: the scale (or R for ohms) is the decimal point
+        (?P<code_int>\d+)(?P<code_scale>{_scales}|R|r)(?P<code_frac>\d+)(?:\s*(?P<code_unit>(?i:{_units})))?(?![a-zA-Z])
+    |
+        # 1uF, 0.1 W, 1/10W, ±5%, 50 ppm
+        (?:(?P<sign>±|\+/-)\s*)?(?P<number>\d+\.\d*|\.\d+|\d+/\d+|\d+)\s*(?P<scale>{_scales})?\s*(?P<unit>(?i:{_units}))(?![a-zA-Z])
+    |
+        (?P<package>(?:{_alternatives(package_codes)})(?!\d)\S*|(?i:{_alternatives(package_families)})-?\d+\S*)
+    |
+        (?P<type>\w*(?i:{_alternatives(type_words)})\S*)
+    )
+    """, re.VERBOSE)
+
+def _scaled(number : str, scale : str) -> Decimal:
+    return mult.convert_to_decimal(number) * mult.get_conversion_factor(scale)
+
+def extract_attributes(text : str) -> list:
+    """
+    Scans a description once and returns the attributes found in it, in order.
+
+    Multipliers are case sensitive ('m' is milli, 'M' is mega), units are not.
+    """
+    attributes = []
+    for match in attribute_pattern.finditer(text):
+        start, end = match.span()
+        groups = match.groupdict()
+
+        if groups['number'] is not None:
+            unit, kind = unit_spellings[groups['unit'].lower()]
+            scale = mult.normalize_scale(groups['scale'])
+            if kind in ('tolerance', 'tempco') and scale:
+                #5 m% does not make sense, this is not a tolerance
+                continue
+            attributes.append(Attribute(kind, start, end, match.group(0), groups['number'], scale, unit, _scaled(groups['number'], scale)))
+
+        elif groups['code_int'] is not None:
+            number = f"{groups['code_int']}.{groups['code_frac']}"
+            if groups['code_scale'] in ('R', 'r'):
+                scale, unit = '', 'Ω'
+            else:
+                scale = mult.normalize_scale(groups['code_scale'])
+                unit = unit_spellings[groups['code_unit'].lower()][0] if groups['code_unit'] else ''
+            if unit not in ('', 'Ω', 'F', 'H'):
+                continue
+            attributes.append(Attribute('value', start, end, match.group(0), number, scale, unit, _scaled(number, scale)))
+
+        elif groups['package'] is not None:
+            attributes.append(Attribute('package', start, end, match.group(0)))
+
+        else:
+            attributes.append(Attribute('type', start, end, match.group(0)))
+
+    return attributes
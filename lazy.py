@@ -0,0 +1,43 @@
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on the first use of one of its attributes.
+
+    The import is done under a lock, so threads using the module for the first time at the same
+    time (e.g. concurrent requests of the search service) all get the fully imported module.
+    """
+    def __init__(self, name : str):
+        super().__init__(name)
+        self._lock = threading.Lock()
+        self._module = None
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attr : str):
+        if attr.startswith('__') and attr.endswith('__'):
+            #introspection (copy, pickle, help...) must not import the module
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+def lazy_import(name : str):
+    """
+    Returns a module that is only really imported when one of its attributes is used.
+
+    Used for the network stack (requests), so runs that never call the API (cache hits, offline
+    searches) do not pay for importing it.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f"No module named '{name}'")
+    return LazyModule(name)
@@ -0,0 +1,131 @@
+import json
+import threading
+
+# seconds, for the HTTP latency
+default_latency_buckets = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# seconds, for the filter time per part
+default_part_buckets = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 1e-2)
+
+class Histogram:
+    def __init__(self, buckets : tuple):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value : float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self) -> dict:
+        return {"buckets": dict(zip(map(str, self.buckets), self.counts)), "sum": self.sum, "count": self.count}
+
+class Metrics:
+    """
+    Counters, gauges and histograms of the process, exportable as JSON or in the Prometheus text format.
+
+    The searches never reset them, so they add up over all the searches of the process (the
+    concurrent searches of the service too), as Prometheus expects from counters. To count the
+    calls of one run, take the difference of api_calls before and after it.
+
+    Every metric can have labels, given as keyword arguments:
+
+        metrics.inc("parts_rejected_total", attribute="voltage")
+        metrics.observe("http_request_seconds", 0.21, status="200")
+    """
+    def __init__(self, prefix : str = "mouser_"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+    def inc(self, name : str, value : float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name : str, value : float, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name : str, value : float, buckets : tuple = default_latency_buckets, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def get(self, name : str, **labels) -> float:
+        """
+        Returns a counter. Without labels, the sum over all its labels.
+        """
+        with self.lock:
+            if labels:
+                return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    @property
+    def api_calls(self) -> int:
+        return int(self.get("api_calls_total"))
+
+    def to_dict(self) -> dict:
+        def entries(items, value_fn):
+            out = {}
+            for (name, labels), value in sorted(items, key=lambda item: item[0]):
+                out.setdefault(name, []).append({"labels": dict(labels), "value": value_fn(value)})
+            return out
+
+        with self.lock:
+            return {
+                "counters": entries(self.counters.items(), lambda v: v),
+                "gauges": entries(self.gauges.items(), lambda v: v),
+                "histograms": entries(self.histograms.items(), lambda h: h.to_dict()),
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        def label_text(labels, extra=()):
+            labels = list(labels) + list(extra)
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+        lines = []
+        with self.lock:
+            for kind, items in (("counter", self.counters), ("gauge", self.gauges)):
+                declared = set()
+                for (name, labels), value in sorted(items.items()):
+                    if name not in declared:
+                        lines.append(f"# TYPE {self.prefix}{name} {kind}")
+                        declared.add(name)
+                    lines.append(f"{self.prefix}{name}{label_text(labels)} {value}")
+
+            declared = set()
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if name not in declared:
+                    lines.append(f"# TYPE {self.prefix}{name} histogram")
+                    declared.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{self.prefix}{name}_bucket{label_text(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.prefix}{name}_bucket{label_text(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{self.prefix}{name}_sum{label_text(labels)} {histogram.sum}")
+                lines.append(f"{self.prefix}{name}_count{label_text(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
@@ -1,5 +1,6 @@
 import re
-from decimal import Decimal, getcontext
+from decimal import Decimal, getcontext, localcontext
+from functools import lru_cache
 
 conversion_factors_down = {
     'm': Decimal('1e-3'),
@@ -16,6 +17,28 @@ conversion_factors_up = {
     'G': Decimal('1e9')
 }
 
+# other spellings of the scales that can appear in a description
+scale_aliases = {
+    'µ': 'u',
+    'μ': 'u',
+    'f': 'f', 'femto': 'f', 'Femto': 'f',
+    'p': 'p', 'P': 'p', 'pico': 'p', 'Pico': 'p',     #descriptions in capitals use P for pico, not peta
+    'n': 'n', 'N': 'n', 'nano': 'n', 'Nano': 'n',
+    'u': 'u', 'U': 'u', 'micro': 'u', 'Micro': 'u',
+    'm': 'm', 'milli': 'm', 'Milli': 'm',
+    'k': 'k', 'K': 'k', 'kilo': 'k', 'Kilo': 'k',
+    'M': 'M', 'mega': 'M', 'Mega': 'M', 'meg': 'M', 'Meg': 'M',
+    'G': 'G', 'giga': 'G', 'Giga': 'G',
+}
+
+def normalize_scale(scale : str) -> str:
+    """
+    Returns the standard scale ('u', 'k', 'M', ...) of any of its spellings, '' for no scale.
+    """
+    if not scale:
+        return ''
+    return scale_aliases[scale]
+
 def get_conversion_factor(prefix : str) -> Decimal:
 
     if prefix == '':
@@ -86,6 +109,16 @@ def build_mutiplier_patterns() -> str:
 mutiplier_patterns = build_mutiplier_patterns()
 
 def get_number_scale_regex_options( nm : list[tuple] ) -> str:
+    """
+    Returns the regex fragment matching any of the (number, scale) variants.
+
+    Every fragment is built once and cached, the few values a spec uses are cheaper to build than
+    to load from a precomputed table.
+    """
+    return build_number_scale_regex_options(tuple(nm))
+
+@lru_cache(maxsize=1024)
+def build_number_scale_regex_options( nm : tuple ) -> str:
     #si lista son mas, entonces son opciones con | o sea ( |  | )     
     #si lista es 1, entonces es una sola opcion
     if len(nm) == 1:
@@ -93,18 +126,17 @@ def get_number_scale_regex_options( nm : list[tuple] ) -> str:
         n = nm_[0]
         m = nm_[1]
         if m == "":
-            return f"{n}\s*"
+            return f"{n}\\s*"
         else:
-            return f"{n}\s*(?:{m})?"
+            return f"{n}\\s*(?:{m})?"
         
     out = "("
     for n, m in nm:
         variants = get_scale_variants(m)
-        print(f"{n} {variants}")
         if variants != "":
-            out += f"{n}\s*(?:{variants})?|"
+            out += f"{n}\\s*(?:{variants})?|"
         else:
-            out += f"{n}\s*|"
+            out += f"{n}\\s*|"
 
     out = out[:-1] + ")"
     return out
@@ -121,9 +153,12 @@ def convert_to_decimal(value : str) -> Decimal:
 def format_decimal(value, precision=3) -> str:
     # Crear un Decimal con la precisión deseada
     quantize_str = '1.' + '0' * precision  # Por ejemplo, '1.000' para precision=3
-    quantized_value = value.quantize(Decimal(quantize_str))
+    with localcontext() as ctx:
+        # enough digits for the integer part plus the decimals, big values would not fit otherwise
+        ctx.prec = max(ctx.prec, value.adjusted() + precision + 2)
+        quantized_value = value.quantize(Decimal(quantize_str))
     # Convertir a cadena y eliminar ceros innecesarios
-    return f"{quantized_value}".rstrip('0').rstrip('.')
+    return f"{quantized_value:f}".rstrip('0').rstrip('.')
 
 def get_number_variants_with_multi(value : str, scale:str ) -> list:
     '''
@@ -136,8 +171,6 @@ def get_number_variants_with_multi(value : str, scale:str ) -> list:
 
     quiero que me generes una lista de keywords con las combinaciones posibles
     '''
-    representations = []    #will store the complete representation
-
     getcontext().prec = 25
 
     # converts the raw value to a Decimal object
@@ -147,6 +180,15 @@ def get_number_variants_with_multi(value : str, scale:str ) -> list:
     conversion_factor  = get_conversion_factor(scale)
     value_in_standard_unit = value * conversion_factor
 
+    return list(compute_number_variants(value_in_standard_unit))
+
+@lru_cache(maxsize=1024)
+def compute_number_variants(value_in_standard_unit : Decimal) -> tuple:
+    """
+    Computes the representation variants of a value in the standard unit, see get_number_variants_with_multi.
+    """
+    representations = []    #will store the complete representation
+
     # Add the decimal representation
     value_formatted = format_decimal(value_in_standard_unit , 20 )
     representations.append( (value_formatted, "" ) )
@@ -188,7 +230,7 @@ def get_number_variants_with_multi(value : str, scale:str ) -> list:
 
         representations.append((f"{str_scaled_value}" , scale)) 
 
-    return representations
+    return tuple(representations)
 
 def split_value_unit(input :str, unit_patterns: str) -> tuple:
     pattern = rf"{decimal_number_pattern}\s*({unit_patterns})?"
@@ -0,0 +1,86 @@
+import json
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from records import PartRecord
+from spec import CompiledSpec
+
+def split_ranges(path : str, chunks : int) -> list:
+    """
+    Splits a file of lines into about `chunks` (start, end) byte ranges, every range ending at a line end.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+
+    ranges = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        step = max(1, size // chunks)
+        start = 0
+        while start < size:
+            end = min(size, start + step)
+            if end < size:
+                newline = mm.find(b"\n", end)
+                end = size if newline == -1 else newline + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def filter_range(path : str, start : int, end : int, compiled_spec : CompiledSpec, fields : list) -> list:
+    """
+    Parses and filters the part JSON lines between start and end. Runs in the worker processes.
+    """
+    records = []
+    #a line without the package digits can not match, skip decoding it
+    hint = compiled_spec.package.encode() if compiled_spec.package and compiled_spec.package.isdigit() else None
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        position = start
+        while position < end:
+            newline = mm.find(b"\n", position, end)
+            line_end = end if newline == -1 else newline
+            line = mm[position:line_end]
+            position = line_end + 1
+
+            if not line.strip() or (hint is not None and hint not in line):
+                continue
+            try:
+                part = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            description_cleaned, failed = compiled_spec.check(part.get("Description") or "")
+            if failed is None:
+                records.append(PartRecord.from_part(part, fields, description_cleaned))
+    return records
+
+def filter_jsonl_parallel(path : str, compiled_spec : CompiledSpec, fields : list, workers : int = None, chunk_size : int = 32 * 1024 * 1024) -> list:
+    """
+    Filters a harvested JSON lines corpus (like data_global.txt) on all the cores.
+
+    The file is split in byte ranges ending at line ends, and every range is parsed and filtered by
+    a process of a pool with the (picklable) CompiledSpec. Workers read the file through mmap, so it
+    is never copied in full. The records are returned in file order.
+
+    Args:
+        path (str): The JSON lines file, one part per line.
+        compiled_spec (CompiledSpec): The spec, as returned by poc.calculate_search_patterns.
+        fields (list): The fields to include in the returned data.
+        workers (int): Number of processes. Defaults to the number of cores.
+        chunk_size (int): Approximate size in bytes of each range.
+
+    Returns:
+        list: A list of dictionaries, where each dictionary contains data for a component.
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    #a few ranges per worker, so a slow range does not leave the others idle
+    chunks = max(workers * 4, size // chunk_size + 1)
+    ranges = split_ranges(path, chunks)
+
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(filter_range, path, start, end, compiled_spec, fields) for start, end in ranges]
+        for future in futures:
+            records.extend(future.result())
+    return records
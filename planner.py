@@ -0,0 +1,278 @@
+import poc
+from cache import ResponseCache
+from lazy import lazy_import
+from ratelimit import CallBudget, QuotaExceeded
+from records import PartRecord
+
+# only imported when the first call is made
+requests = lazy_import("requests")
+
+records_per_request = 50
+
+class KeywordProbe:
+    """
+    What the first page of a keyword told us: NumberOfResult, the parts of the page, and the ones accepted by the spec.
+    """
+    def __init__(self, keyword : str, data : dict, compiled_spec):
+        self.keyword = keyword
+        self.data = data
+        self.total_results = data.get("SearchResults", {}).get("NumberOfResult", 0)
+        self.parts = data.get("SearchResults", {}).get("Parts", [])
+        self.keys = {part_key(part) for part in self.parts}
+        self.accepted = [(part, description) for part, description
+                         in zip(self.parts, compiled_spec.filter(part.get("Description") for part in self.parts))
+                         if description is not None]
+
+    def expected_yield(self, known : set) -> float:
+        """
+        Expected number of new accepted parts over all the pages, extrapolated from the first page.
+        """
+        if not self.parts:
+            return 0.0
+        new = sum(1 for part, _ in self.accepted if part_key(part) not in known)
+        return new / len(self.parts) * self.total_results
+
+def part_key(part : dict) -> tuple:
+    return (part.get("ManufacturerPartNumber"), part.get("Manufacturer"))
+
+def plan_keywords(api_key, keyword_list : list, compiled_spec, total_occurrences, cache = None, refresh : bool = False) -> tuple:
+    """
+    Probes the keywords and returns them in the order they should be paged.
+
+    Each keyword is probed by fetching its first page (so the probe is not wasted, it is page 0).
+    Keywords without results are dropped, and so are the ones whose first page brought the same
+    parts as a keyword already probed with the same NumberOfResult, as they are the same search.
+    Probing stops early when the first pages already have enough accepted parts.
+
+    Returns:
+        tuple: (probes, seen) the useful probes sorted by expected unique yield, and the keys of all the probed parts.
+    """
+    probes = []
+    seen = set()
+    accepted = set()
+
+    for keyword in keyword_list:
+        data = poc.search_component(api_key, keyword, records_per_request, 0, cache=cache, refresh=refresh)
+        probe = KeywordProbe(keyword, data, compiled_spec)
+
+        if probe.total_results == 0:
+            print(f"Keyword dropped (no results): {keyword}")
+            continue
+        if any(p.total_results == probe.total_results and probe.keys <= p.keys for p in probes):
+            print(f"Keyword dropped (redundant): {keyword}")
+            continue
+
+        probes.append(probe)
+        seen |= probe.keys
+        accepted |= {part_key(part) for part, _ in probe.accepted}
+        if len(accepted) >= total_occurrences:
+            break
+
+    #greedy order: the keyword with more new accepted parts first
+    ordered = []
+    known = set()
+    while probes:
+        best = max(probes, key=lambda p: p.expected_yield(known))
+        probes.remove(best)
+        ordered.append(best)
+        known |= {part_key(part) for part, _ in best.accepted}
+
+    return ordered, seen
+
+def get_planned_components(api_key , component_params : dict , total_occurrences , fields, cache = None, refresh : bool = False):
+    """
+    Like get_filtered_components, but plans the keywords before paging them.
+
+    The keywords are probed and ordered with plan_keywords, then paged in that order. Parts are
+    deduplicated by ManufacturerPartNumber + Manufacturer while fetching, so total_occurrences
+    counts unique parts and the search stops as soon as there are enough.
+
+    Returns:
+        list: A list of dictionaries, where each dictionary contains data for a component.
+    """
+    all_records = []
+
+    error = poc.search_params_error(component_params)
+    if error:
+        print(f"Invalid component params: {error}")
+        return all_records
+
+    compiled_spec = poc.calculate_search_patterns(component_params)
+
+    if not compiled_spec:
+        print("Invalid component params")
+        return all_records
+
+    keyword_list = poc.get_keywords_from_params(component_params)
+    print("Keyword: ", str(keyword_list))
+
+    unique = set()
+
+    def accept(part, description_cleaned):
+        key = part_key(part)
+        if key in unique:
+            return
+        unique.add(key)
+        all_records.append(PartRecord.from_part(part, fields, description_cleaned))
+
+    try:
+        probes, _ = plan_keywords(api_key, keyword_list, compiled_spec, total_occurrences, cache, refresh)
+
+        #first pages are already here
+        for probe in probes:
+            for part, description_cleaned in probe.accepted:
+                accept(part, description_cleaned)
+
+        for probe in probes:
+            starting_record = records_per_request
+            while len(all_records) < total_occurrences and starting_record < probe.total_results:
+                data = poc.search_component(api_key, probe.keyword, records_per_request, starting_record, cache=cache, refresh=refresh)
+                parts = data.get("SearchResults", {}).get("Parts", [])
+                for part, description_cleaned in zip(parts, compiled_spec.filter(part.get("Description") for part in parts)):
+                    if description_cleaned is not None:
+                        accept(part, description_cleaned)
+                starting_record += records_per_request
+
+    except requests.exceptions.RequestException as e:
+        print( f"HTTP error:  {e} api calls {poc.metrics.api_calls}")
+    except QuotaExceeded as e:
+        print( f"{e} api calls {poc.metrics.api_calls}")
+
+    return all_records[:total_occurrences]
+
+def estimate_search(api_key, component_params : dict, total_occurrences, cache = None, probe : bool = False) -> dict:
+    """
+    Dry run of get_filtered_components: estimates the API calls it would make, without making them.
+
+    The NumberOfResult of every keyword is taken from its cached first page, and its share of
+    accepted parts from all its cached pages (smoothed, so a first page without accepted parts does
+    not mean the keyword has none). With probe=True, the first pages not cached are fetched (one
+    call per keyword, saved in the cache, so the search does not pay for them again). The keywords
+    are then paged as the search would, in order and stopping at total_occurrences expected
+    records, counting the pages that are not cached and not already paged by a previous keyword.
+    Keywords without a first page count as one call with no records, so the estimate is then a
+    lower bound (known is False).
+
+    Returns:
+        dict: {"keywords": [{"keyword", "number_of_result", "acceptance"}], "estimated_calls", "max_calls"
+            (every page of every keyword, None if not known), "expected_records", "probe_calls", "known"},
+            plus "error" when the params can not be searched (nothing is estimated).
+    """
+    estimate = {"keywords": [], "estimated_calls": 0, "max_calls": 0, "expected_records": 0, "probe_calls": 0, "known": True}
+    error = poc.search_params_error(component_params)
+    if error:
+        print(f"Invalid component params: {error}")
+        estimate["error"] = error
+        return estimate
+
+    compiled_spec = poc.calculate_search_patterns(component_params)
+    if not compiled_spec:
+        print("Invalid component params")
+        return estimate
+
+    def cached_page(keyword, starting_record):
+        if cache is None:
+            return None
+        return cache.peek(poc.keyword_payload(keyword, records_per_request, starting_record))
+
+    for keyword in poc.get_keywords_from_params(component_params):
+        data = cached_page(keyword, 0)
+        if data is None and probe:
+            data = poc.search_component(api_key, keyword, records_per_request, 0, cache=cache)
+            estimate["probe_calls"] += 1
+
+        if data is None:
+            estimate["keywords"].append({"keyword": keyword, "number_of_result": None, "acceptance": None})
+            estimate["known"] = False
+            continue
+
+        total_results = data.get("SearchResults", {}).get("NumberOfResult", 0)
+        seen = accepted = 0
+        start = 0
+        while data is not None:
+            parts = data.get("SearchResults", {}).get("Parts", [])
+            seen += len(parts)
+            accepted += sum(1 for description in compiled_spec.filter(part.get("Description") for part in parts) if description is not None)
+            start += records_per_request
+            data = cached_page(keyword, start) if start < total_results else None
+        estimate["keywords"].append({"keyword": keyword, "number_of_result": total_results, "acceptance": (accepted + 0.5) / (seen + 1)})
+
+    found = 0.0
+    max_paged = set()
+    paged = set()
+    for entry in estimate["keywords"]:
+        keyword, total_results = entry["keyword"], entry["number_of_result"]
+        if total_results is None:
+            estimate["estimated_calls"] += 1
+            estimate["max_calls"] = None
+            continue
+
+        #a keyword without results still costs its first page
+        for start in range(0, max(total_results, 1), records_per_request):
+            #the same page of the same search (even written differently) is paid once, then it is cached
+            key = ResponseCache.make_key(poc.keyword_payload(keyword, records_per_request, start))
+            free = key in paged or cached_page(keyword, start) is not None
+            if estimate["max_calls"] is not None and not free and key not in max_paged:
+                estimate["max_calls"] += 1
+            max_paged.add(key)
+            if found >= total_occurrences:
+                continue
+            if not free:
+                estimate["estimated_calls"] += 1
+            paged.add(key)
+            found += entry["acceptance"] * min(records_per_request, total_results - start)
+
+    estimate["expected_records"] = min(int(found), total_occurrences)
+    return estimate
+
+def run_with_budget(api_key, searches : list, budget : int, fields, cache = None) -> list:
+    """
+    Runs several searches with a fixed number of API calls, the highest priority first.
+
+    Every search is estimated (estimate_search, without probing) and gets the calls it needs, or
+    what is left of the budget. While it runs, poc.rate_limiter is wrapped in a CallBudget, so it
+    stops cleanly when its calls are spent. Calls a search did not use go to the next ones.
+
+    Args:
+        searches (list): Dicts with "params", "total" and optionally "priority" (higher first, default 0).
+        budget (int): API calls available for all the searches.
+
+    Returns:
+        list: For every search, in priority order, a dict with "search", "allocated", "used" and "records",
+            plus "error" for the searches whose params can not be searched (they are skipped).
+    """
+    results = []
+    remaining = budget
+    #invalid searches are reported before any call is made
+    errors = [poc.search_params_error(search["params"]) for search in searches]
+    for search, error in zip(searches, errors):
+        if error:
+            print(f"Invalid component params {search['params']}: {error}")
+
+    for search, error in sorted(zip(searches, errors), key=lambda item: -item[0].get("priority", 0)):
+        if error:
+            results.append({"search": search, "allocated": 0, "used": 0, "records": [], "error": error})
+            continue
+
+        params, total = dict(search["params"]), search["total"]
+        estimate = estimate_search(api_key, dict(params), total, cache)
+        #an estimate with unknown keywords is a lower bound, let it use what is left
+        allocated = min(remaining, estimate["estimated_calls"]) if estimate["known"] else remaining
+        if allocated <= 0 and estimate["estimated_calls"] > 0:
+            print(f"No calls left for {params}")
+            results.append({"search": search, "allocated": 0, "used": 0, "records": []})
+            continue
+
+        limiter = poc.rate_limiter
+        poc.rate_limiter = CallBudget(limiter, allocated)
+        try:
+            records = poc.get_filtered_components(api_key, params, total, fields, cache=cache)
+            used = poc.rate_limiter.used
+        finally:
+            poc.rate_limiter = limiter
+
+        remaining -= used
+        results.append({"search": search, "allocated": allocated, "used": used, "records": records})
+        print(f"Budget: {used}/{allocated} calls used, {len(records)} records, {remaining} calls left")
+
+    return results
@@ -1,22 +1,87 @@
-import requests
+import argparse
 import json
+import os
 import re
+import time
 import mult
+from cache import ResponseCache, SpecCache
+from lazy import lazy_import
+from ratelimit import QuotaLimiter, QuotaExceeded, SharedQuotaLimiter
+from transport import Transport
+from singleflight import SingleFlight
+from metrics import Metrics, default_part_buckets
+from store import PartStore, jsonl_descriptions, read_jsonl_parts
+from export import open_sink
+from records import PartRecord
+from checkpoint import Checkpoint, default_checkpoint_path
+from spec import CompiledSpec, power_unit_patterns, voltage_unit_patterns, voltage_rating_field_name, spec_fields, spec_hash
 
-power_unit_patterns = r'W|w|Watt|watt'
-voltage_unit_patterns = r'V|v|Volt|volt'
+# the network stack is only imported when an API call is made
+requests = lazy_import("requests")
 
-api_calls = 0
+# metrics of the current run: api calls, latency, bytes, accepted/rejected parts... see Metrics
+metrics = Metrics()
 
-voltage_rating_field_name = "voltage"
+# pooled, gzip, retrying HTTP client shared by all the calls, see Transport
+transport = Transport(metrics)
 
-def search_component(api_key, keyword, records_per_request, starting_record, in_stock : bool = False, rohs : bool = False):
-    global api_calls
-    url = "https://api.mouser.com/api/v2/search/keyword?apiKey=" + api_key
-    headers = {
-        "Content-Type": "application/json"
-    }
+# can point to a local stand-in of the API, see bench/stub_server.py
+api_base_url = "https://api.mouser.com/api/v2"
+
+# every API call acquires a token here, so we never go faster than Mouser's limits
+rate_limiter = QuotaLimiter(per_minute=30, per_day=1000)
+
+# attribute tables of the local corpora, see get_local_table()
+local_tables = {}
+
+# every part returned by the API is kept here, see get_part_store()
+part_store_path = 'parts.db'
+part_store = None
+
+# what calculate_search_patterns added to the params of every spec, by spec_hash
+calculated_specs = {}
+
+# optional on-disk copy of calculated_specs, shared by runs (the CLI sets it)
+spec_cache = None
+
+# identical keyword/page requests in flight share one API call
+inflight = SingleFlight()
+
+def get_part_store() -> PartStore:
+    """
+    Returns the local part store, opening it on first use.
+    """
+    global part_store
+    if part_store is None:
+        part_store = PartStore(part_store_path)
+    return part_store
 
+def post_api(api_key, path : str, payload : dict) -> dict:
+    """
+    Makes one call to the Mouser API and returns the decoded response.
+
+    The call goes through the transport, which acquires a token from the rate limiter for every
+    attempt, retries throttled and transient errors, and records the metrics. The returned parts
+    are kept in the local part store.
+    """
+    url = api_base_url + path + "?apiKey=" + api_key
+
+    try:
+        data = transport.post(url, payload, rate_limiter)
+    finally:
+        remaining_minute, remaining_day = rate_limiter.remaining()
+        metrics.set("quota_remaining", remaining_minute, period="minute")
+        metrics.set("quota_remaining", remaining_day, period="day")
+
+    parts = data.get("SearchResults", {}).get("Parts", [])
+    #keep every part we paid for in the local store
+    get_part_store().upsert_parts(parts)
+    return data
+
+def keyword_payload(keyword, records_per_request, starting_record, in_stock : bool = False, rohs : bool = False) -> dict:
+    """
+    Returns the request body of a keyword search page, which is also its key in the response cache.
+    """
     search_options = "None"
     if in_stock and rohs:
         search_options = "RohsAndInStock"
@@ -25,7 +90,7 @@ def search_component(api_key, keyword, records_per_request, starting_record, in_
     elif rohs:
         search_options = "Rohs"
  
-    payload = {
+    return {
         "SearchByKeywordRequest": {
             "keyword": keyword,
             "records": records_per_request,
@@ -34,21 +99,55 @@ def search_component(api_key, keyword, records_per_request, starting_record, in_
             # "searchWithYourSignUpLanguage": search_with_your_sign_up_language            
         }
     }
-   
-    response = requests.post(url, headers=headers, json=payload)
-    api_calls += 1
-
-    if response.status_code == 200:
-        #open for write and append        
-        with open('data_global.txt',  'a') as f:
-            data = response.json()            
-            parts = data.get("SearchResults", {}).get("Parts", [])
-            for part in parts:
-                f.write(json.dumps(part) + "\n")
-
-        return response.json()
-    else:
-        response.raise_for_status()
+
+def search_component(api_key, keyword, records_per_request, starting_record, in_stock : bool = False, rohs : bool = False, cache : ResponseCache = None, refresh : bool = False):
+    """
+    Searches Mouser by keyword and returns the decoded response.
+
+    If a cache is given, the response is served from it when a valid entry exists for the same
+    request, so no API call is spent. With refresh=True the cache is not read, but the fresh
+    response is still stored on it. Callers asking for the same page at the same time (other
+    threads, or the daemon's users) share a single API call.
+    """
+    payload = keyword_payload(keyword, records_per_request, starting_record, in_stock, rohs)
+
+    if cache is not None and not refresh:
+        data = cache.get(payload)
+        if data is not None:
+            metrics.inc("pages_fetched_total", source="cache")
+            return data
+
+    def fetch():
+        data = post_api(api_key, "/search/keyword", payload)
+        if cache is not None:
+            cache.put(payload, data)
+        return data
+
+    #the same page asked by someone else right now is not paid twice
+    data, shared = inflight.do(ResponseCache.make_key(payload), fetch)
+    metrics.inc("pages_fetched_total", source="coalesced" if shared else "api")
+
+    return data
+
+# most part numbers the part number search accepts in one request, separated by "|"
+max_part_numbers_per_request = 10
+
+def search_part_numbers(api_key, part_numbers : list, exact : bool = True):
+    """
+    Searches Mouser by part number (up to max_part_numbers_per_request at once) and returns the decoded response.
+
+    The parts found, with their current Availability and PriceBreaks, are written to the local part store.
+    """
+    if len(part_numbers) > max_part_numbers_per_request:
+        raise ValueError(f"At most {max_part_numbers_per_request} part numbers per request, got {len(part_numbers)}")
+
+    payload = {
+        "SearchByPartRequest": {
+            "mouserPartNumber": "|".join(part_numbers),
+            "partSearchOptions": "Exact" if exact else "None",
+        }
+    }
+    return post_api(api_key, "/search/partnumber", payload)
 
 def validate_component( params : dict) -> bool:
     valid_types = ["resistor", "capacitor", "inductor", "connector", "switch", "diode", "transistor", "ic", "led", "crystal", "oscillator", "fuse", "relay", "transformer", "sensor"]
@@ -73,6 +172,23 @@ def validate_component( params : dict) -> bool:
 
     return True
 
+def search_params_error(params : dict) -> str:
+    """
+    Returns why the params can not be searched with keywords, or None if they can.
+
+    The keywords are built from the value and tolerance, plus the power of resistors or the voltage
+    of capacitors (see get_keywords_from_params), so those are required.
+    """
+    if not isinstance(params, dict):
+        return "params must be an object"
+    required = {'resistor': ('value', 'tolerance', 'power'), 'capacitor': ('value', 'tolerance', voltage_rating_field_name)}
+    if params.get('type') not in required:
+        return f"type must be one of {', '.join(required)}, not {params.get('type')!r}"
+    missing = [name for name in required[params['type']] if name not in params]
+    if missing:
+        return f"a {params['type']} search needs {', '.join(missing)}"
+    return None
+
 def get_keywords_from_params(params : dict) -> str:
     """
     Generates a list of keyword strings based on the provided component parameters.
@@ -135,7 +251,7 @@ def get_keywords_from_params(params : dict) -> str:
         
     return keywords
 
-def calculate_search_patterns(component_params : dict) -> bool:
+def calculate_search_patterns(component_params : dict) -> CompiledSpec:
     """
     Calculates search patterns for filtering component descriptions.
 
@@ -143,14 +259,28 @@ def calculate_search_patterns(component_params : dict) -> bool:
     These patterns are used for filtering component descriptions later. If the function cannot calculate 
     the search patterns due to invalid component parameters, it returns False.
 
+    The patterns are compiled once into an immutable CompiledSpec, which is returned and also kept
+    in component_params['compiled_spec'] for clenup_description. What is calculated for a spec is
+    remembered (by spec_hash) for the life of the process, so the same spec is only calculated once,
+    and also on disk if spec_cache is set.
+
     Args:
         component_params (dict): A dictionary containing parameters for the type of component. 
             It includes type, package, tolerance, power, voltage, value, and tempco.
 
     Returns:
-        bool: True if the search patterns were successfully calculated, False otherwise.
+        CompiledSpec: The compiled matcher if the search patterns were successfully calculated, False otherwise.
 
     """
+    key = spec_hash(component_params)
+    calculated = calculated_specs.get(key)
+    if calculated is None and spec_cache is not None:
+        calculated = spec_cache.get(key)
+        if calculated is not None:
+            calculated_specs[key] = calculated
+    if calculated is not None:
+        component_params.update(calculated)
+        return calculated['compiled_spec']
 
     if voltage_rating_field_name in component_params:
         if component_params['type']=='capacitor':  #only for caps  
@@ -250,8 +380,14 @@ def calculate_search_patterns(component_params : dict) -> bool:
     
     # "package" does not have special preprocessing    
     # "tempco" does not have special preprocessing
+
+    compiled_spec = CompiledSpec.from_params(component_params)
+    component_params['compiled_spec'] = compiled_spec
+    calculated_specs[key] = {name: value for name, value in component_params.items() if name not in spec_fields}
+    if spec_cache is not None:
+        spec_cache.put(key, calculated_specs[key])
         
-    return True
+    return compiled_spec
 
 def clenup_description(component_params : dict, description : str) -> tuple :
     """
@@ -262,6 +398,9 @@ def clenup_description(component_params : dict, description : str) -> tuple :
     voltage, tolerance, type, package, and temperature coefficient) with a standard format. For example, 
     it replaces "1 W", "1W", "1 Watt", "1 watt", "1w", "1 watt", or "1watt" with "1W".
 
+    The params must have gone through calculate_search_patterns. The work is done by the CompiledSpec
+    it built, see CompiledSpec.match.
+
     Args:
         component_params (dict): A dictionary containing parameters for the type of component. 
             It includes type, package, tolerance, power, voltage, and value.
@@ -270,275 +409,454 @@ def clenup_description(component_params : dict, description : str) -> tuple :
     Returns:
         tuple: A tuple containing the cleaned up description and a boolean indicating whether the description is valid.
     """
-    valid = False   #if the description is valid
-    description = description.lower()
-    #remove , from description
-    description = description.replace(",", "")
+    compiled_spec = component_params.get('compiled_spec')
+    if compiled_spec is None:
+        compiled_spec = CompiledSpec.from_params(component_params)
+    return compiled_spec.match(description)
 
-    if 'value' in component_params:        
-        value = component_params['value']
-        value_pattern = component_params['value_pattern']  
-        match = re.compile(value_pattern).search(description)
-        if match:
-            matched_text = match.group(0)
-            description = description.replace(matched_text, value)
+def iter_accepted_parts(compiled_spec : CompiledSpec, parts : list, fields : list):
+    """
+    Yields the requested fields of the parts whose description matches the spec, with the description cleaned up,
+    as compact PartRecords.
+    """
+    check = compiled_spec.check
+    for part in parts:
+        #one observation per part, so the histogram is the distribution of the filter time of a part
+        start = time.perf_counter()
+        description_cleaned, failed = check(part.get("Description") or "")
+        metrics.observe("part_filter_seconds", time.perf_counter() - start, buckets=default_part_buckets)
+
+        if failed is None:
+            metrics.inc("parts_accepted_total")
+            yield PartRecord.from_part(part, fields, description_cleaned)
         else:
-            return "", False #no match, invalid description
-        
-
-    if 'power' in component_params:  #only for resistors
-
-        better_power_rating = component_params['flags'].get('better_power_rating', False)    
-        power = component_params['power']
-        power_pattern = component_params['power_pattern']        
+            metrics.inc("parts_rejected_total", attribute=failed)
+            print("Skipped record: ", part.get("Description"))
 
-        if not better_power_rating:
-            match = re.compile( power_pattern ).search(description)
-            if match:
-                matched_text = match.group(0)
-                description = description.replace(matched_text, power)
-            else:
-                return "", False #no match, invalid description                    
-        else:     
-            power_variants = component_params['power_number_variants']
-            power_unit = component_params['power_unit']
-                        
-            #usando la unidad, hay que relevar el numero que indica la descripcion
-            #luego, tomar el valor raw de los tempco_variants (sin el multiplicador)
-            #compararlos, si la comparacion es valida, entonces crear un pattern nuevo y reemplazar. 
-            value_match_pattern = re.compile(rf'{mult.decimal_number_pattern}\s*({power_unit_patterns})\b')            
-            value_match = value_match_pattern.search(description)
-
-            if value_match:
-                value_matched = value_match.group(1) 
-                value_matched = mult.convert_to_decimal(value_matched)
-              
-                value_power_rating = power_variants[0][0]
-                value_power_rating = mult.convert_to_decimal(value_power_rating)
-
-                if value_matched >= value_power_rating:
-                    #accepted
-                    matched_text = value_match.group(0)
-                    description = description.replace(matched_text, mult.format_decimal (value_matched) + power_unit)
-                else:
-                    return "", False
-            else:
-                return "", False
-
-    if 'voltage' in component_params :   #only for caps        
-        better_voltage_rating = component_params['flags'].get('better_voltage_rating', False)            
-        voltage = component_params[ voltage_rating_field_name ]
-        voltage_pattern = component_params[ 'voltage_pattern' ]        
-
-        if not better_voltage_rating:
-          
-            match = re.compile( voltage_pattern ).search(description)
-            if match:
-                matched_text = match.group(0)
-                description = description.replace(matched_text, voltage)
-            else:
-                return "", False #no match, invalid description                    
-        else:     
-            voltage_variants = component_params[ 'voltage_number_variants' ]
-            voltage_unit = component_params[ 'voltage_unit']
-                        
-            #usando la unidad, hay que relevar el numero que indica la descripcion
-            #luego, tomar el valor raw de los tempco_variants (sin el multiplicador)
-            #compararlos, si la comparacion es valida, entonces crear un pattern nuevo y reemplazar. 
-            value_match_pattern = re.compile(rf'{mult.decimal_number_pattern}\s*({voltage_unit_patterns})\b')            
-            value_match = value_match_pattern.search(description)
-
-            if value_match:
-                value_matched = value_match.group(1) 
-                value_matched = mult.convert_to_decimal(value_matched)
-              
-                value_voltage_rating = voltage_variants[0][0]
-                value_voltage_rating = mult.convert_to_decimal(value_voltage_rating)
-
-                if value_matched >= value_voltage_rating:
-                    #accepted
-                    matched_text = value_match.group(0)
-                    description = description.replace(matched_text, mult.format_decimal (value_matched) + voltage_unit)
-                else:
-                    return "", False
-            else:
-                return "", False
+def filter_parts(component_params : dict, parts : list, fields : list, all_records : list):
+    """
+    Keeps the requested fields of the parts whose description matches the component params, appending them to all_records.
+    """
+    compiled_spec = component_params.get('compiled_spec') or CompiledSpec.from_params(component_params)
+    all_records.extend(iter_accepted_parts(compiled_spec, parts, fields))
 
-    if 'tolerance' in component_params:
-        tolerance = component_params['tolerance']
-        tolerance_pattern = component_params['tolerance_pattern']
-        match = re.compile(tolerance_pattern).search(description)
+def get_local_table(corpus) -> tuple:
+    """
+    Returns the AttributeTable of a local corpus and the keys of its rows, to get the parts back.
 
-        if match: #'\\b1\\s*(?:)?\\s*(?:%)\\b'
-            matched_text = match.group(0)
-            description = description.replace(matched_text, " " +  tolerance) #add space before the tolerance because the partter removed it.
-        else:
-            return "", False
-
-    if 'type' in component_params:
-        type_ = component_params['type']
-        type_pattern = rf'\S*{type_}\S*'
-        # description = type_pattern.sub(type_, description)
-        match = re.compile(type_pattern).search(description)
-        if match:
-            matched_text = match.group(0)
-            description = description.replace(matched_text, type_) #add space before the tolerance because the partter removed it.
-        else:
-            return "", False
-
-    if 'package' in component_params:
-        package = component_params['package']
-        #the regex pattern should be such as can have the pachage name within another 
-        #word, for example, 0603 can be within a word like "0603SMD"
-        package_pattern = rf'\S*{package}\S*'
-        match = re.compile(package_pattern).search(description)
-        if match:
-            matched_text = match.group(0)
-            description = description.replace(matched_text, package) #add space before the tolerance because the partter removed it.
-        else:
-            return "", False
-        
-    if 'tempco' in component_params:                
-        better_tempco = component_params['flags'].get('better_tempco', False)
-        tempco_pattern = component_params['tempco_pattern']
-        tempco = component_params['tempco']
+    Every description of the corpus is parsed once; the table is kept (local_tables) and reused by
+    the next local searches until the corpus changes. The keys are the rowids of the part store
+    (see PartStore.parts_by_rowid), or the byte offsets of the lines of a dump (see read_jsonl_parts).
+    numpy is only imported by the local searches.
+    """
+    from table import AttributeTable
 
-        if not better_tempco:
-            #tempco mus be exact
-            # tempco_pattern = rf'\S*{tempco}\S*'
+    if isinstance(corpus, PartStore):
+        key, version = ('store', os.path.abspath(corpus.path)), corpus.version()
+    else:
+        stat = os.stat(corpus)
+        key, version = ('jsonl', os.path.abspath(corpus)), (stat.st_mtime, stat.st_size)
 
-            match = re.compile(tempco_pattern).search(description)
+    cached = local_tables.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
 
-            if match:
-                matched_text = match.group(0)
-                description = description.replace(matched_text, tempco)
-            else:
-                return "", False        
-        else:
-            tempco_pattern = component_params['tempco_pattern']
-            tempco_variants = component_params['tempco_number_variants']
-            tempco_unit = component_params['tempco_unit']
-
-            #usando la unidad, hay que relevar el numero que indica la descripcion
-            #luego, tomar el valor raw de los tempco_variants (sin el multiplicador)
-            #compararlos, si la comparacion es valida, entonces crear un pattern nuevo y reemplazar. 
-            value_match_pattern = re.compile(rf'(\d+)\s*{tempco_unit}')
-            value_match = value_match_pattern.search(description)
-            if value_match:
-                value_matched = value_match.group(1)
-                value = int(value_matched)
-              
-                value_tempco = tempco_variants[0][0]
-                value = int(value_tempco)
-
-                if value_matched <= value_tempco:
-                    #accepted
-                    matched_text = value_match.group(0)
-                    description = description.replace(matched_text, value_matched + tempco_unit)
-                else:
-                    return "", False
+    if isinstance(corpus, PartStore):
+        keys, descriptions = corpus.descriptions()
+    else:
+        keys, descriptions = jsonl_descriptions(corpus)
+    table = AttributeTable.from_descriptions(descriptions)
+    local_tables[key] = (version, table, keys)
+    return table, keys
 
-            else:
-                return "", False
+def iter_local_components(component_params : dict , total_occurrences , fields, corpus = None):
+    """
+    Generator version of get_local_components, yields each record as soon as it is accepted.
 
-    return description , True
+    The spec is evaluated over the whole corpus at once with the corpus' AttributeTable (see
+    get_local_table), and only the parts it accepts are read and run through the spec again, for
+    their cleaned up descriptions.
+    """
+    compiled_spec = calculate_search_patterns(component_params)
 
-def get_filtered_components(api_key , component_params : dict , total_occurrences , fields):
+    if not compiled_spec:
+        print("Invalid component params")
+        return
+
+    if corpus is None:
+        corpus = get_part_store()
+
+    table, keys = get_local_table(corpus)
+    rows = table.spec_mask(compiled_spec).nonzero()[0]
+
+    found = 0
+    batch_size = 500
+    for start in range(0, len(rows), batch_size):
+        batch = [keys[row] for row in rows[start:start + batch_size]]
+        parts = corpus.parts_by_rowid(batch) if isinstance(corpus, PartStore) else read_jsonl_parts(corpus, batch)
+        for record in iter_accepted_parts(compiled_spec, parts, fields):
+            found += 1
+            yield record
+            if found >= total_occurrences:
+                return
+
+def get_local_components(component_params : dict , total_occurrences , fields, corpus = None):
     """
-    Fetches and filters electronic components based on given parameters.
+    Filters already harvested parts, without making any API call.
 
-    This function makes API calls to fetch electronic components data. It filters the data based on the 
-    component parameters provided and returns the filtered data.
+    The same calculate_search_patterns + clenup_description pipeline as get_filtered_components
+    runs over a local corpus, and the records have the same shape.
 
     Args:
-        api_key (str): The API key to access the electronic components data.
-        component_params (dict): A dictionary containing parameters for the type of component. 
-            It includes type, package, tolerance, power, voltage, and value.
-        total_occurrences (int): The total number of occurrences to fetch.
+        component_params (dict): A dictionary containing parameters for the type of component.
+        total_occurrences (int): The total number of occurrences to return.
         fields (list): The fields to include in the returned data.
+        corpus (PartStore or str): The part store, or the path of a JSON lines dump (like data_global.txt).
+            Defaults to the local part store.
 
     Returns:
         list: A list of dictionaries, where each dictionary contains data for a component.
+    """
+    return list(iter_local_components(component_params, total_occurrences, fields, corpus))
 
-    Raises:
-        HTTPError: If an error occurs during the API call.
+def iter_filtered_components(api_key , component_params : dict , total_occurrences , fields, cache : ResponseCache = None, refresh : bool = False, offline : bool = False, corpus = None, checkpoint : Checkpoint = None):
     """
-    global api_calls
-        
-    all_records = []
+    Generator version of get_filtered_components.
+
+    Each accepted record is yielded as soon as its page arrives, so the first results are available
+    after the first page instead of at the end of the search, and memory does not grow with the
+    number of records (unless checkpointing). The caller can stop at any time, no more pages are fetched then.
+
+    With a checkpoint, the cursor and the accepted records are saved after every page, and the
+    checkpoint is removed once the search completes. If the checkpoint has the state of an
+    unfinished search with the same spec, keywords, total and fields, its records are yielded
+    first and the search goes on from the saved page, so no page is paid twice.
+    """
+    if offline:
+        yield from iter_local_components(component_params, total_occurrences, fields, corpus)
+        return
+
     records_per_request = 50
     starting_record = 0
 
-    valid_spec = calculate_search_patterns(component_params)
+    error = search_params_error(component_params)
+    if error:
+        print(f"Invalid component params: {error}")
+        return
 
-    if not valid_spec:
+    compiled_spec = calculate_search_patterns(component_params)
+
+    if not compiled_spec:
         print("Invalid component params")
-        return all_records
+        return
 
     keyword_list = get_keywords_from_params(component_params)
     print("Keyword: ", str(keyword_list))
     
     total_results = 0
     kw_idx = 0
-    api_calls = 0
+    found = 0
+
+    state = None
+    accepted = []
+    if checkpoint is not None:
+        spec = {key: component_params[key] for key in spec_fields if key in component_params}
+        state = checkpoint.load_for(spec_hash(spec), keyword_list, total_occurrences, fields)
+
+        def save_checkpoint():
+            checkpoint.save({"spec_hash": spec_hash(spec), "params": spec, "total_occurrences": total_occurrences,
+                             "fields": list(fields), "keyword_list": keyword_list, "kw_idx": kw_idx,
+                             "starting_record": starting_record, "records": accepted})
+
+    if state is not None:
+        accepted = state["records"]
+        kw_idx, starting_record = state["kw_idx"], state["starting_record"]
+        for record in accepted[:total_occurrences]:
+            found += 1
+            yield record
+        print(f"Resuming at keyword {kw_idx} record {starting_record} with {found} records")
 
     # while starting_record < total_occurrences:
     while True:
         keyword = keyword_list[kw_idx]
         try:
-            data = search_component(api_key, keyword, records_per_request, starting_record)
-        except requests.exceptions.HTTPError as e:
-            print( f"HTTP error:  {e} api calls {api_calls}")
+            data = search_component(api_key, keyword, records_per_request, starting_record, cache=cache, refresh=refresh)
+        except requests.exceptions.RequestException as e:
+            print( f"HTTP error:  {e} api calls {metrics.api_calls}")
+            break
+        except QuotaExceeded as e:
+            print( f"{e} api calls {metrics.api_calls}")
             break
 
         total_results = data.get("SearchResults", {}).get("NumberOfResult", 0)
 
         parts = data.get("SearchResults", {}).get("Parts", [])
-        
-        for part in parts:
-            filtered_part = {field: part.get(field) for field in fields}
-            
-            description_cleaned , res = clenup_description(component_params, filtered_part["Description"])
-
-            if res:
-                filtered_part["Description"] = description_cleaned
-                all_records.append(filtered_part)
-            else:
-                print("Skipped record: ", filtered_part["Description"])
+        for record in iter_accepted_parts(compiled_spec, parts, fields):
+            found += 1
+            if checkpoint is not None:
+                accepted.append(record)
+            yield record
 
         starting_record += records_per_request
         if starting_record>=total_results:
             #no more records with the gioven keyword
             kw_idx += 1
             starting_record = 0
-            if kw_idx >= len(keyword_list):
-                #all keywords searched
-                break
 
-        if len(all_records) >= total_occurrences:
-            #all found
-            break  
+        done = kw_idx >= len(keyword_list) or found >= total_occurrences
+        if checkpoint is not None:
+            if done:
+                #a finished search is not resumed, the next run starts over
+                checkpoint.clear()
+            else:
+                save_checkpoint()
 
-    return all_records
+        if done:
+            #all keywords searched, or all found
+            break
 
-#main function for the script
-def main():
+def get_filtered_components(api_key , component_params : dict , total_occurrences , fields, cache : ResponseCache = None, refresh : bool = False, offline : bool = False, corpus = None, checkpoint : Checkpoint = None):
+    """
+    Fetches and filters electronic components based on given parameters.
 
-    #, "flags" : { "better_drift " : True, "better_power" : True, "better_tolerance" : True} // allows finding better components
-    # params = { "type" : "resistor", "package" : "0603", "tolerance" : "1%", "power" : "1/10W", "value" : "2K7"  , "flags" : { "better_tempco" : False , "better_power_rating" : True } }
-    params = { "type" : "capacitor", "package" : "0603", "tolerance" : "20%", voltage_rating_field_name : "50V", "value" : "1u"  , "flags" : { "better_voltage_rating" : False  } }
+    This function makes API calls to fetch electronic components data. It filters the data based on the 
+    component parameters provided and returns the filtered data. See iter_filtered_components to get
+    the records while they are found.
+
+    Args:
+        api_key (str): The API key to access the electronic components data.
+        component_params (dict): A dictionary containing parameters for the type of component. 
+            It includes type, package, tolerance, power, voltage, and value.
+        total_occurrences (int): The total number of occurrences to fetch.
+        fields (list): The fields to include in the returned data.
+        cache (ResponseCache): Optional response cache. Pages already cached cost no API calls.
+        refresh (bool): If True, cached pages are fetched again and the cache is updated.
+        offline (bool): If True, no API call is made and the parts are taken from `corpus`, see get_local_components.
+        corpus (PartStore or str): The local corpus used in offline mode.
+        checkpoint (Checkpoint): Optional checkpoint, the search is saved after every page and resumed from it.
+
+    Returns:
+        list: A list of dictionaries, where each dictionary contains data for a component.
+
+    Raises:
+        HTTPError: If an error occurs during the API call.
+    """
+    return list(iter_filtered_components(api_key, component_params, total_occurrences, fields, cache, refresh, offline, corpus, checkpoint))
+
+def resume_filtered_components(api_key, checkpoint : Checkpoint, cache : ResponseCache = None):
+    """
+    Resumes the search saved in a checkpoint (with its params, total and fields) at the page it stopped.
+
+    Returns:
+        list: All the records of the search, the ones found before the checkpoint first.
+    """
+    state = checkpoint.load()
+    if state is None:
+        print(f"No checkpoint in {checkpoint.path}")
+        return []
+    return get_filtered_components(api_key, state["params"], state["total_occurrences"], state["fields"], cache=cache, checkpoint=checkpoint)
+
+def get_filtered_components_concurrent(api_key , component_params : dict , total_occurrences , fields, concurrency : int = 8, cache : ResponseCache = None, refresh : bool = False):
+    """
+    Same as get_filtered_components, but the keyword/page fetches run concurrently.
+
+    Up to `concurrency` requests are in flight at the same time over the pooled session. The rate
+    limiter still spaces the calls, so the search runs as fast as the quota allows, never faster.
+    Pages that were not started when enough records were found are cancelled.
 
-    # Example usage
-    api_key = USER_API_KEY
+    Returns:
+        list: A list of dictionaries, where each dictionary contains data for a component.
+    """
+    all_records = []
+    records_per_request = 50
 
-    records =  get_filtered_components(api_key, params, 30 , ["Description", "Manufacturer", "ManufacturerPartNumber", "Category", "DatasheetUrl"])
+    error = search_params_error(component_params)
+    if error:
+        print(f"Invalid component params: {error}")
+        return all_records
 
-    #create str with records but with a \n between each record
-    records = "\n".join([str(record) for record in records])
+    valid_spec = calculate_search_patterns(component_params)
 
-    with open('result_total.txt', 'w') as f:
-        f.write( records )
+    if not valid_spec:
+        print("Invalid component params")
+        return all_records
+
+    keyword_list = get_keywords_from_params(component_params)
+    print("Keyword: ", str(keyword_list))
+
+    def fetch(keyword, starting_record):
+        return search_component(api_key, keyword, records_per_request, starting_record, cache=cache, refresh=refresh)
+
+    async def run():
+        from engine import FetchEngine
+        engine = FetchEngine(fetch, concurrency)
+        async with aclosing(engine.iter_pages(keyword_list, records_per_request)) as pages:
+            async for kw_idx, starting_record, data in pages:
+                parts = data.get("SearchResults", {}).get("Parts", [])
+                filter_parts(component_params, parts, fields, all_records)
+
+                if len(all_records) >= total_occurrences:
+                    #all found
+                    break
+
+    import asyncio
+    from contextlib import aclosing
+    try:
+        asyncio.run(run())
+    except requests.exceptions.RequestException as e:
+        print( f"HTTP error:  {e} api calls {metrics.api_calls}")
+    except QuotaExceeded as e:
+        print( f"{e} api calls {metrics.api_calls}")
+
+    return all_records
+
+default_fields = ["Description", "Manufacturer", "ManufacturerPartNumber", "Category", "DatasheetUrl"]
+
+def parse_args(argv : list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Searches Mouser components by parameters",
+                                     epilog="example: python poc.py --type capacitor --package 0603 --value 1u --voltage 50V --tolerance 20%%")
+    spec = parser.add_argument_group("spec (or --spec)")
+    spec.add_argument("--spec", help="JSON file with a params object, or a list of them")
+    spec.add_argument("--type")
+    spec.add_argument("--package")
+    spec.add_argument("--value")
+    spec.add_argument("--tolerance")
+    spec.add_argument("--power")
+    spec.add_argument(f"--{voltage_rating_field_name}", dest="voltage")
+    spec.add_argument("--tempco")
+    spec.add_argument("--better-power", action="store_true", help="accept a higher power rating")
+    spec.add_argument("--better-voltage", action="store_true", help="accept a higher voltage rating")
+    spec.add_argument("--better-tempco", action="store_true", help="accept a lower tempco")
+
+    parser.add_argument("--total", type=int, default=30, help="records wanted per spec")
+    parser.add_argument("--fields", default=",".join(default_fields), help="comma separated part fields to keep")
+    parser.add_argument("--output", default="result_total.jsonl", help="results file, the format comes from the extension (.jsonl, .csv.gz, .parquet, .arrow)")
+    parser.add_argument("--api-key", default=os.environ.get("MOUSER_API_KEY"), help="defaults to $MOUSER_API_KEY")
+    parser.add_argument("--offline", action="store_true", help="search the local part store (or --corpus) without API calls")
+    parser.add_argument("--corpus", help="JSON lines dump searched in offline mode instead of the part store")
+    parser.add_argument("--cache", default="mouser_cache.db", help="response cache file")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the response cache")
+    parser.add_argument("--refresh", action="store_true", help="fetch cached pages again")
+    parser.add_argument("--spec-cache", default=".spec_cache", help="directory of the calculated specs")
+    parser.add_argument("--checkpoint", help="save the search after every page to this file, so it can be resumed (single spec only)")
+    parser.add_argument("--resume", action="store_true", help="resume the search saved in the checkpoint (--checkpoint, default search.checkpoint.json)")
+    parser.add_argument("--dry-run", action="store_true", help="only print the API calls each spec would need, nothing is fetched")
+    parser.add_argument("--probe", action="store_true", help="with --dry-run, fetch the first pages not cached (one call per keyword) for a better estimate")
+    parser.add_argument("--budget", type=int, help="API calls for all the specs, given to the highest \"priority\" specs first")
+    parser.add_argument("--shared-quota", default=os.environ.get("MOUSER_QUOTA_DB"),
+                        help="quota file shared by all the processes using the same API key (defaults to $MOUSER_QUOTA_DB)")
+    parser.add_argument("--metrics", default="metrics", help="metrics are written to METRICS.json and METRICS.prom")
+    return parser.parse_args(argv)
+
+def specs_from_args(args : argparse.Namespace) -> list:
+    """
+    Returns the params dicts given with --spec, or built from the attribute arguments.
+    """
+    if args.spec:
+        with open(args.spec, 'r', encoding='utf-8') as f:
+            specs = json.load(f)
+        return specs if isinstance(specs, list) else [specs]
+
+    params = {name: getattr(args, name) for name in ('type', 'package', 'tolerance', 'power', 'voltage', 'value', 'tempco')
+              if getattr(args, name) is not None}
+    flags = {name: True for name, given in (('better_power_rating', args.better_power), ('better_voltage_rating', args.better_voltage),
+                                            ('better_tempco', args.better_tempco)) if given}
+    if flags:
+        params['flags'] = flags
+    return [params] if params else []
+
+#main function for the script
+def main(argv : list = None):
+    """
+    Command line entry point, see python poc.py --help.
+
+    Only the modules a run needs are loaded: requests is imported on the first API call, so runs
+    served by the response cache or offline, with the spec already in the spec cache, start fast.
+    """
+    global spec_cache, rate_limiter
+
+    #, "flags" : { "better_drift " : True, "better_power" : True, "better_tolerance" : True} // allows finding better components
+    # params = { "type" : "resistor", "package" : "0603", "tolerance" : "1%", "power" : "1/10W", "value" : "2K7"  , "flags" : { "better_tempco" : False , "better_power_rating" : True } }
+    args = parse_args(argv)
+    fields = [field.strip() for field in args.fields.split(",") if field.strip()]
+    total = args.total
+
+    #running again after the quota is back resumes the search where it stopped
+    checkpoint = None
+    if args.resume or args.checkpoint:
+        checkpoint = Checkpoint(args.checkpoint or default_checkpoint_path)
+    if args.resume:
+        state = checkpoint.load()
+        if state is None:
+            print(f"No checkpoint in {checkpoint.path}")
+            return 1
+        specs, total, fields = [state["params"]], state["total_occurrences"], state["fields"]
+    else:
+        specs = specs_from_args(args)
+        if not specs:
+            print("No spec given, see --help")
+            return 2
+        if checkpoint is not None:
+            #a saved search is only resumed with --resume
+            checkpoint.clear()
+
+    #a dry run only reads the cache, unless it probes
+    if not args.offline and not args.api_key and not (args.dry_run and not args.probe):
+        print("An API key is needed: --api-key or $MOUSER_API_KEY")
+        return 2
+
+    spec_cache = SpecCache(args.spec_cache) if args.spec_cache else None
+    if args.shared_quota:
+        #workers sharing the key take their calls from the same buckets
+        rate_limiter = SharedQuotaLimiter(args.shared_quota)
+    cache = None if args.no_cache or args.offline else ResponseCache(args.cache)
+
+    if args.dry_run or args.budget is not None:
+        #planner imports this module, it is only loaded when needed
+        from planner import estimate_search, run_with_budget
+
+    if args.dry_run:
+        for params in specs:
+            params = {name: value for name, value in params.items() if name != "priority"}
+            estimate = estimate_search(args.api_key, dict(params), total, cache, probe=args.probe)
+            print(json.dumps({"params": params, **estimate}, ensure_ascii=False))
+        return 0
+
+    #each record is written as soon as it is found, the format comes from the extension (.csv.gz, .parquet...)
+    with open_sink(args.output, fields) as sink:
+        if args.budget is not None:
+            searches = [{"params": {name: value for name, value in params.items() if name != "priority"}, "total": total,
+                         "priority": params.get("priority", 0)} for params in specs]
+            for result in run_with_budget(args.api_key, searches, args.budget, fields, cache):
+                for record in result["records"]:
+                    sink.write(record)
+        elif len(specs) > 1 and not args.offline:
+            #several specs are one BOM, so the keywords they share are fetched once
+            from bom import resolve_bom
+            results, _ = resolve_bom(args.api_key, [{name: value for name, value in params.items() if name != "priority"} for params in specs],
+                                          total, fields, cache=cache, refresh=args.refresh)
+            for records in results:
+                for record in records:
+                    sink.write(record)
+        else:
+            for params in specs:
+                #only a single search is checkpointed
+                records = iter_filtered_components(args.api_key, dict(params), total, fields, cache=cache, refresh=args.refresh,
+                                                   offline=args.offline, corpus=args.corpus,
+                                                   checkpoint=checkpoint if len(specs) == 1 and not args.offline else None)
+                for record in records:
+                    sink.write(record)
+        print(f"{sink.count} records written to {args.output}")
+
+    if cache is not None:
+        print("Cache: ", cache.stats())
+
+    with open(f'{args.metrics}.json', 'w') as f:
+        f.write(metrics.to_json())
+    with open(f'{args.metrics}.prom', 'w') as f:
+        f.write(metrics.to_prometheus())
+    return 0
 
 #main
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
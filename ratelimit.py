@@ -0,0 +1,345 @@
+import collections
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+class QuotaExceeded(Exception):
+    """
+    Raised when the daily quota is spent, or a call would have to wait longer than allowed for
+    its slot. `wait` is the seconds until the next call is possible.
+    """
+    def __init__(self, wait : float):
+        super().__init__(f"API quota exhausted, next call available in {wait:.0f}s")
+        self.wait = wait
+
+class BudgetExhausted(QuotaExceeded):
+    """
+    Raised when a call would go over the calls allotted to a search.
+    """
+    def __init__(self, budget : int):
+        super().__init__(0.0)
+        self.args = (f"Call budget of {budget} calls spent",)
+        self.budget = budget
+
+seconds_per_day = 24 * 3600
+
+def utc_day(now : float) -> str:
+    """
+    Returns the day (UTC, "YYYY-MM-DD") of a wall clock time, the daily quota starts over at midnight UTC.
+    """
+    return time.strftime("%Y-%m-%d", time.gmtime(now))
+
+def next_call_time(calls, limit : int, period : float, now : float) -> float:
+    """
+    Returns the earliest time a new call can be made without going over `limit` calls in any `period` seconds.
+
+    Args:
+        calls: The times of the calls already booked, sorted (at least the last `limit` ones).
+        limit (int): Calls allowed in any window of `period` seconds.
+        period (float): Length of the window in seconds.
+        now (float): The current time, on the same clock as `calls`.
+    """
+    #calls are made in the order they were booked
+    when = max(now, calls[-1]) if calls else now
+    if len(calls) >= limit:
+        when = max(when, calls[-limit] + period)
+    return when
+
+class SlidingWindow:
+    """
+    Log of the calls booked in the last `period` seconds, so no window of that length has more than `limit` calls.
+
+    Calls are booked ahead of time: a caller takes the time of its call (next_time, then book) and
+    waits until then. This way concurrent callers are spaced out in the order they asked, and a
+    burst never goes over the limit, whatever window it is looked at.
+    """
+    def __init__(self, limit : int, period : float):
+        self.limit = limit
+        self.period = period
+        self.calls = collections.deque()
+
+    def _expire(self, now : float):
+        while self.calls and self.calls[0] <= now - self.period:
+            self.calls.popleft()
+
+    def next_time(self, now : float) -> float:
+        self._expire(now)
+        return next_call_time(self.calls, self.limit, self.period, now)
+
+    def book(self, when : float):
+        self.calls.append(when)
+
+    def available(self, now : float) -> int:
+        """
+        Returns the calls that can be booked right now without waiting.
+        """
+        self._expire(now)
+        return max(0, self.limit - len(self.calls))
+
+default_calls_path = 'mouser_calls.json'
+
+class DayCounter:
+    """
+    Calls made on the current day (UTC), starting over at midnight UTC.
+
+    The count is kept in a JSON file, read before every call, so a run counts the calls of the runs
+    before it on the same day. Processes calling at the same time should share a SharedQuotaLimiter
+    instead. Without a path the count is only kept in memory.
+
+    Args:
+        path (str): The JSON file of the count, or None.
+    """
+    def __init__(self, path : str = None):
+        self.path = path
+        self.day = None
+        self.calls = 0
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.day, self.calls = state["day"], state["calls"]
+        except (OSError, ValueError, KeyError, TypeError):
+            #no count yet (or not readable), the day starts now
+            pass
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.calls-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"day": self.day, "calls": self.calls}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def count(self, now : float) -> int:
+        """
+        Returns the calls made on the day of `now` (wall clock).
+        """
+        if self.path is not None:
+            self._load()
+        day = utc_day(now)
+        if self.day != day:
+            self.day, self.calls = day, 0
+        return self.calls
+
+    def add(self, now : float):
+        self.count(now)
+        self.calls += 1
+        if self.path is not None:
+            self._save()
+
+class QuotaLimiter:
+    """
+    Enforces Mouser's per-minute and per-day call limits.
+
+    Every API call must reserve its slot first. The per-minute limit is a sliding window that
+    spaces the calls, so no 60 seconds ever have more than `per_minute` calls; a call that would
+    wait longer than `max_wait` raises QuotaExceeded instead of blocking. The per-day limit is a
+    count of the calls of the day (UTC), kept in `path` across runs: once it reaches `per_day`,
+    QuotaExceeded is raised right away, with the seconds left until midnight UTC.
+
+    Args:
+        per_minute (int): Calls allowed per minute.
+        per_day (int): Calls allowed per day.
+        max_wait (float): Longest wait in seconds accepted before raising QuotaExceeded.
+        path (str): JSON file of the calls of the day, None to only count them in memory.
+    """
+    def __init__(self, per_minute : int = 30, per_day : int = 1000, max_wait : float = 120, path : str = default_calls_path):
+        self.minute = SlidingWindow(per_minute, 60)
+        self.per_day = per_day
+        self.day = DayCounter(path)
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Reserves a call and returns the seconds the caller has to wait before making it.
+        """
+        with self.lock:
+            today = time.time()
+            if self.day.count(today) >= self.per_day:
+                raise QuotaExceeded(seconds_per_day - today % seconds_per_day)
+            now = time.monotonic()
+            when = self.minute.next_time(now)
+            if when - now > self.max_wait:
+                raise QuotaExceeded(when - now)
+            self.minute.book(when)
+            self.day.add(today)
+            return when - now
+
+    def remaining(self) -> tuple:
+        """
+        Returns the calls available right now in the minute, and the ones left for the day.
+        """
+        with self.lock:
+            return self.minute.available(time.monotonic()), max(0, self.per_day - self.day.count(time.time()))
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        import asyncio
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+default_quota_path = 'mouser_quota.db'
+
+class SharedQuotaLimiter:
+    """
+    QuotaLimiter shared by all the processes using the same API key on this host.
+
+    The calls booked in the last minute and the calls made per day live in a SQLite file instead of
+    in memory. Every reservation is one write transaction (BEGIN IMMEDIATE), so processes book their
+    calls one after the other and together never go over the limits: with N workers each one gets
+    its share of the rate, and the aggregate stays at the limit. The calls of the day are kept in a
+    ledger per day (UTC) and per process, and their sum is the daily count. Times are wall clock, as
+    they are compared across processes.
+
+    It has the same interface as QuotaLimiter, so it can replace poc.rate_limiter.
+
+    Args:
+        path (str): The SQLite file shared by the processes.
+        per_minute (int): Calls allowed per minute, for all the processes.
+        per_day (int): Calls allowed per day, for all the processes.
+        max_wait (float): Longest wait in seconds accepted before raising QuotaExceeded.
+        timeout (float): Seconds to wait for another process holding the file lock.
+    """
+    def __init__(self, path : str = default_quota_path, per_minute : int = 30, per_day : int = 1000, max_wait : float = 120, timeout : float = 30):
+        self.path = path
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+
+        #autocommit mode, transactions are opened explicitly so the write lock is taken before reading
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS calls (
+                at REAL NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS calls_at ON calls (at)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ledger (
+                day TEXT NOT NULL,
+                pid INTEGER NOT NULL,
+                calls INTEGER NOT NULL,
+                PRIMARY KEY (day, pid)
+            )""")
+
+    def _day_calls(self, day : str) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(calls), 0) FROM ledger WHERE day = ?", (day,)).fetchone()[0]
+
+    def _minute_calls(self, now : float) -> list:
+        """
+        Returns the sorted times of the last calls booked in the minute, at most per_minute of them.
+        """
+        rows = self.conn.execute("SELECT at FROM calls WHERE at > ? ORDER BY at DESC LIMIT ?", (now - 60, self.per_minute))
+        return [at for at, in rows][::-1]
+
+    def reserve(self) -> float:
+        """
+        Reserves a call and returns the seconds the caller has to wait before making it.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                #the time is read holding the lock, so it is never behind the one another process just wrote
+                now = time.time()
+                day = utc_day(now)
+                if self._day_calls(day) >= self.per_day:
+                    raise QuotaExceeded(seconds_per_day - now % seconds_per_day)
+                when = next_call_time(self._minute_calls(now), self.per_minute, 60, now)
+                if when - now > self.max_wait:
+                    raise QuotaExceeded(when - now)
+                self.conn.execute("DELETE FROM calls WHERE at <= ?", (now - 60,))
+                self.conn.execute("INSERT INTO calls (at) VALUES (?)", (when,))
+                self.conn.execute("""
+                    INSERT INTO ledger (day, pid, calls) VALUES (?, ?, 1)
+                    ON CONFLICT(day, pid) DO UPDATE SET calls = calls + 1""", (day, os.getpid()))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            return when - now
+
+    def remaining(self) -> tuple:
+        """
+        Returns the calls available right now in the minute, and the ones left for the day, for all the processes.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                now = time.time()
+                minute = len(self._minute_calls(now))
+                day = self._day_calls(utc_day(now))
+            finally:
+                self.conn.execute("COMMIT")
+            return max(0, self.per_minute - minute), max(0, self.per_day - day)
+
+    def ledger(self, day : str = None) -> dict:
+        """
+        Returns the calls reserved on a day (UTC, "YYYY-MM-DD", today by default) by every process, as {pid: calls}.
+        """
+        day = day or utc_day(time.time())
+        with self.lock:
+            return dict(self.conn.execute("SELECT pid, calls FROM ledger WHERE day = ?", (day,)))
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        import asyncio
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def close(self):
+        self.conn.close()
+
+class CallBudget:
+    """
+    Caps the calls made through a limiter: after `calls` calls, BudgetExhausted is raised instead.
+
+    It has the same interface as QuotaLimiter, so it can stand in for poc.rate_limiter while a
+    search runs with a fixed number of calls.
+    """
+    def __init__(self, limiter : QuotaLimiter, calls : int):
+        self.limiter = limiter
+        self.calls = calls
+        self.used = 0
+        self.max_wait = limiter.max_wait
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self.lock:
+            if self.used >= self.calls:
+                raise BudgetExhausted(self.calls)
+            #a call refused by the limiter (QuotaExceeded) does not use the budget
+            wait = self.limiter.reserve()
+            self.used += 1
+        return wait
+
+    def remaining(self) -> tuple:
+        return self.limiter.remaining()
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        import asyncio
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,93 @@
+import sys
+from collections.abc import Mapping
+
+# fields whose values repeat across parts, their strings are interned so every record shares them
+interned_fields = frozenset(("Manufacturer", "Category", "Availability", "ROHSStatus", "LifecycleStatus",
+                             "Min", "Mult", "UnitWeightKg", "ImagePath"))
+
+class RecordSchema:
+    """
+    The field names of a set of records and their positions, shared by all the records with the same fields.
+    """
+    __slots__ = ('fields', 'index')
+
+    def __init__(self, fields : tuple):
+        self.fields = fields
+        self.index = {field: i for i, field in enumerate(fields)}
+
+schemas = {}
+
+def get_schema(fields) -> RecordSchema:
+    """
+    Returns the schema of the given fields (plus Description), the same object for the same fields.
+    """
+    fields = tuple(fields)
+    if "Description" not in fields:
+        fields += ("Description",)
+    schema = schemas.get(fields)
+    if schema is None:
+        schema = schemas[fields] = RecordSchema(fields)
+    return schema
+
+def _intern(field : str, value):
+    if field in interned_fields and isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+class PartRecord(Mapping):
+    """
+    Compact, read-only record of the requested fields of a part.
+
+    A record is a tuple of values and a schema shared by all the records with the same fields,
+    instead of a dict per part, and the strings that repeat (Manufacturer, Category...) are
+    interned. It behaves as a read-only dict (record["Manufacturer"], record.get(), dict(record),
+    == with a dict); to_dict() builds a real dict when one is needed. Use json_default to serialize it.
+    """
+    __slots__ = ('schema', 'values')
+
+    def __init__(self, schema : RecordSchema, values : tuple):
+        self.schema = schema
+        self.values = values
+
+    @classmethod
+    def from_part(cls, part : dict, fields, description : str) -> 'PartRecord':
+        """
+        Keeps the fields of a part returned by the API, with the Description replaced by the cleaned up one.
+        """
+        schema = get_schema(fields)
+        return cls(schema, tuple(description if field == "Description" else _intern(field, part.get(field))
+                                 for field in schema.fields))
+
+    def __getitem__(self, field : str):
+        return self.values[self.schema.index[field]]
+
+    def __iter__(self):
+        return iter(self.schema.fields)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, field) -> bool:
+        return field in self.schema.index
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return dict(zip(self.schema.fields, self.values))
+
+    def __reduce__(self):
+        #unpickled records (e.g. from worker processes) share the schema and strings of this process again
+        return (_restore, (self.schema.fields, self.values))
+
+def _restore(fields : tuple, values : tuple) -> PartRecord:
+    schema = get_schema(fields)
+    return PartRecord(schema, tuple(_intern(field, value) for field, value in zip(schema.fields, values)))
+
+def json_default(obj):
+    """
+    `default` for json.dump(s), so PartRecords are written as objects.
+    """
+    if isinstance(obj, PartRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
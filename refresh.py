@@ -0,0 +1,52 @@
+import poc
+from lazy import lazy_import
+from ratelimit import QuotaExceeded
+
+# only imported when the first call is made
+requests = lazy_import("requests")
+
+def refresh_pricing(api_key, max_age : float = 24 * 3600, mpns : list = None) -> dict:
+    """
+    Updates the Availability and PriceBreaks of the stored parts that are older than max_age.
+
+    Once a part is known we only need its stock and prices, not a new keyword search: the stale
+    parts are looked up with the part number search, packing poc.max_part_numbers_per_request part
+    numbers in each call, and written back to the part store with the time of the update.
+
+    Args:
+        api_key (str): The API key to access the electronic components data.
+        max_age (float): Parts whose pricing is older than this many seconds are refreshed.
+        mpns (list): Only refresh these ManufacturerPartNumbers (e.g. the ones of a watched BOM).
+
+    Returns:
+        dict: {"stale": parts to refresh, "refreshed": parts updated, "missing": queried part numbers not returned, "api_calls": calls made}
+    """
+    store = poc.get_part_store()
+    stale = store.stale_parts(max_age, mpns)
+    #a part number can be stored for several manufacturers, one query covers all of them
+    part_numbers = list(dict.fromkeys(mpn for mpn, _ in stale))
+    print(f"Pricing refresh: {len(stale)} stale parts, {len(part_numbers)} part numbers")
+
+    first_call = poc.metrics.api_calls
+    refreshed = set()
+    queried = []
+    batch_size = poc.max_part_numbers_per_request
+    try:
+        for start in range(0, len(part_numbers), batch_size):
+            batch = part_numbers[start:start + batch_size]
+            data = poc.search_part_numbers(api_key, batch)
+            queried.extend(batch)
+            for part in data.get("SearchResults", {}).get("Parts", []):
+                refreshed.add((part.get("ManufacturerPartNumber"), part.get("Manufacturer")))
+    except requests.exceptions.RequestException as e:
+        print( f"HTTP error:  {e} api calls {poc.metrics.api_calls}")
+    except QuotaExceeded as e:
+        print( f"{e} api calls {poc.metrics.api_calls}")
+
+    found = {mpn for mpn, _ in refreshed}
+    return {
+        "stale": len(stale),
+        "refreshed": sum(1 for key in stale if key in refreshed),
+        "missing": [mpn for mpn in queried if mpn not in found],
+        "api_calls": poc.metrics.api_calls - first_call,
+    }
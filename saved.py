@@ -0,0 +1,180 @@
+import hashlib
+import json
+import sqlite3
+import time
+import poc
+from lazy import lazy_import
+from planner import part_key
+from ratelimit import QuotaExceeded
+from records import PartRecord, json_default
+from spec import spec_fields, spec_hash
+
+# only imported when the first call is made
+requests = lazy_import("requests")
+
+default_saved_path = 'saved_searches.db'
+
+records_per_request = 50
+
+class SavedSearches:
+    """
+    Saved searches and what their keywords returned the last time they ran.
+
+    For every search (a spec and the fields wanted) and every one of its keywords, the last
+    NumberOfResult, the part numbers seen and the accepted records are kept in a SQLite file,
+    so the next run only has to page the keywords whose results changed. That state belongs to
+    the search name, and to its spec and fields (search_hash): saving the search again with
+    another spec or other fields starts it over.
+
+    Args:
+        path (str): The SQLite file used to persist the searches.
+    """
+    def __init__(self, path : str = default_saved_path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS searches (
+                name TEXT PRIMARY KEY,
+                params TEXT NOT NULL,
+                fields TEXT NOT NULL
+            )""")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_keywords (
+                name TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                search_hash TEXT NOT NULL,
+                number_of_result INTEGER NOT NULL,
+                seen TEXT NOT NULL,
+                accepted TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (name, keyword)
+            )""")
+        self.conn.commit()
+
+    def save_search(self, name : str, component_params : dict, fields : list):
+        spec = {key: component_params[key] for key in spec_fields if key in component_params}
+        self.conn.execute("INSERT OR REPLACE INTO searches (name, params, fields) VALUES (?, ?, ?)",
+                          (name, json.dumps(spec), json.dumps(fields)))
+        self.conn.commit()
+
+    def get_search(self, name : str) -> tuple:
+        """
+        Returns (params, fields) of a saved search, or None.
+        """
+        row = self.conn.execute("SELECT params, fields FROM searches WHERE name = ?", (name,)).fetchone()
+        return None if row is None else (json.loads(row[0]), json.loads(row[1]))
+
+    def names(self) -> list:
+        return [row[0] for row in self.conn.execute("SELECT name FROM searches ORDER BY name")]
+
+    def get_keyword(self, name : str, search_hash : str, keyword : str) -> tuple:
+        """
+        Returns (number_of_result, seen part keys, accepted records by part key) of the last run of a
+        search keyword, or None if there is none for the same spec and fields.
+        """
+        row = self.conn.execute("SELECT number_of_result, seen, accepted FROM search_keywords WHERE name = ? AND keyword = ? AND search_hash = ?",
+                                (name, keyword, search_hash)).fetchone()
+        if row is None:
+            return None
+        accepted = {tuple(key): record for key, record in json.loads(row[2])}
+        return row[0], {tuple(key) for key in json.loads(row[1])}, accepted
+
+    def put_keyword(self, name : str, search_hash : str, keyword : str, number_of_result : int, seen : set, accepted : dict):
+        self.conn.execute("""INSERT OR REPLACE INTO search_keywords (name, keyword, search_hash, number_of_result, seen, accepted, updated)
+                             VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                          (name, keyword, search_hash, number_of_result, json.dumps(sorted(seen, key=_sort_key)),
+                           json.dumps([[list(key), record] for key, record in accepted.items()], default=json_default), time.time()))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def _sort_key(key : tuple) -> tuple:
+    #a part may have no ManufacturerPartNumber or Manufacturer, None can not be compared with strings
+    return tuple((value is not None, value or "") for value in key)
+
+def search_hash(component_params : dict, fields : list) -> str:
+    """
+    Returns a stable hash of the spec and the fields of a search.
+    """
+    return hashlib.sha256(json.dumps([spec_hash(component_params), list(fields)]).encode('utf-8')).hexdigest()
+
+def run_saved_search(api_key, saved : SavedSearches, name : str) -> dict:
+    """
+    Runs a saved search again, paging only the keywords whose results changed since the last run.
+
+    The first page of every keyword is fetched (always fresh, one call). If its NumberOfResult is
+    the same as the last run and it has no part not seen before, the keyword is considered
+    unchanged and its saved records are used. Otherwise all its pages are fetched again.
+
+    Returns:
+        dict: {"records": all the accepted records, "added": records not in the last run,
+            "removed": records of the last run not found anymore, "changed": the keywords paged again,
+            "complete": False if the run was stopped by an error or the quota, "api_calls": calls made}
+    """
+    search = saved.get_search(name)
+    if search is None:
+        raise KeyError(f"No saved search named {name}")
+    component_params, fields = search
+    key_hash = search_hash(component_params, fields)
+
+    compiled_spec = poc.calculate_search_patterns(component_params)
+    if not compiled_spec:
+        print("Invalid component params")
+        return {"records": [], "added": [], "removed": [], "changed": [], "complete": False, "api_calls": 0}
+
+    keyword_list = poc.get_keywords_from_params(component_params)
+    first_call = poc.metrics.api_calls
+
+    before = {}
+    after = {}
+    changed = []
+    complete = False
+
+    def accept(parts, seen, accepted):
+        for part, description_cleaned in zip(parts, compiled_spec.filter(part.get("Description") for part in parts)):
+            seen.add(part_key(part))
+            if description_cleaned is not None:
+                accepted[part_key(part)] = PartRecord.from_part(part, fields, description_cleaned)
+
+    try:
+        for keyword in keyword_list:
+            last = saved.get_keyword(name, key_hash, keyword)
+            if last is not None:
+                before.update(last[2])
+
+            data = poc.search_component(api_key, keyword, records_per_request, 0)
+            total_results = data.get("SearchResults", {}).get("NumberOfResult", 0)
+            parts = data.get("SearchResults", {}).get("Parts", [])
+
+            if last is not None and last[0] == total_results and all(part_key(part) in last[1] for part in parts):
+                after.update(last[2])
+                continue
+
+            changed.append(keyword)
+            seen = set()
+            accepted = {}
+            accept(parts, seen, accepted)
+            for starting_record in range(records_per_request, total_results, records_per_request):
+                data = poc.search_component(api_key, keyword, records_per_request, starting_record)
+                accept(data.get("SearchResults", {}).get("Parts", []), seen, accepted)
+
+            #only saved once the keyword is complete, an interrupted keyword is paged again next time
+            saved.put_keyword(name, key_hash, keyword, total_results, seen, accepted)
+            after.update(accepted)
+        complete = True
+
+    except requests.exceptions.RequestException as e:
+        print( f"HTTP error:  {e} api calls {poc.metrics.api_calls}")
+    except QuotaExceeded as e:
+        print( f"{e} api calls {poc.metrics.api_calls}")
+
+    return {
+        "records": list(after.values()),
+        "added": [record for key, record in after.items() if key not in before],
+        #the keywords not reached would look removed
+        "removed": [record for key, record in before.items() if key not in after] if complete else [],
+        "changed": changed,
+        "complete": complete,
+        "api_calls": poc.metrics.api_calls - first_call,
+    }
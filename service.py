@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import poc
+from cache import ResponseCache
+from ratelimit import SharedQuotaLimiter
+from records import json_default
+
+class SearchService:
+    """
+    Local HTTP/JSON search service, a long running poc.get_filtered_components.
+
+    The process stays up, so the calculated specs (poc.calculated_specs), the response cache and
+    the pooled connections stay warm between searches. Users searching the same part at the same
+    time share the API calls: identical keyword/page requests in flight are made only once
+    (poc.inflight), and the quota limiter is the same for everybody.
+
+        POST /search   {"params": {...}, "total": 30, "fields": [...], "refresh": false} -> {"records": [...]}
+        GET  /metrics  metrics of all the searches since the start, Prometheus text format
+        GET  /health   {"ok": true, "specs": ..., "cache": {...}}
+
+    Args:
+        api_key (str): The API key used for all the searches.
+        cache (ResponseCache): Response cache shared by all the searches.
+        host (str): Address to listen on.
+        port (int): Port to listen on, 0 for any free port.
+    """
+    def __init__(self, api_key : str, cache : ResponseCache = None, host : str = "127.0.0.1", port : int = 8765):
+        self.api_key = api_key
+        self.cache = cache
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def search(self, request : dict) -> dict:
+        params = request.get("params")
+        fields = request.get("fields") or ["Description", "Manufacturer", "ManufacturerPartNumber", "Category", "DatasheetUrl"]
+        if not isinstance(params, dict):
+            raise ValueError("params must be a component params object")
+        error = poc.search_params_error(params)
+        if error:
+            raise ValueError(error)
+        if not poc.calculate_search_patterns(dict(params)):
+            raise ValueError("Invalid component params")
+        total = int(request.get("total", 30))
+        records = poc.get_filtered_components(self.api_key, dict(params), total, fields, cache=self.cache, refresh=bool(request.get("refresh", False)))
+        return {"records": records}
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status : int, body, content_type : str = "application/json"):
+                raw = body.encode('utf-8') if isinstance(body, str) else json.dumps(body, ensure_ascii=False, default=json_default).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    stats = service.cache.stats() if service.cache is not None else None
+                    self._send(200, {"ok": True, "specs": len(poc.calculated_specs), "cache": stats})
+                elif self.path == "/metrics":
+                    self._send(200, poc.metrics.to_prometheus(), "text/plain; version=0.0.4")
+                else:
+                    self._send(404, {"error": f"Not found: {self.path}"})
+
+            def do_POST(self):
+                if self.path != "/search":
+                    self._send(404, {"error": f"Not found: {self.path}"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    self._send(200, service.search(request))
+                except (ValueError, TypeError) as e:
+                    self._send(400, {"error": str(e)})
+                except Exception as e:
+                    #the client always gets an answer, even for a bug
+                    self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+        return Handler
+
+    def start(self) -> 'SearchService':
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+#main
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Mouser search service")
+    parser.add_argument("--api-key", default=os.environ.get("MOUSER_API_KEY"), help="defaults to $MOUSER_API_KEY")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--shared-quota", default=os.environ.get("MOUSER_QUOTA_DB"), help="quota file shared with the other processes using the key")
+    args = parser.parse_args()
+    if not args.api_key:
+        parser.error("an API key is needed, --api-key or $MOUSER_API_KEY")
+
+    if args.shared_quota:
+        poc.rate_limiter = SharedQuotaLimiter(args.shared_quota)
+    service = SearchService(args.api_key, ResponseCache(), args.host, args.port)
+    print(f"Listening on {service.url}")
+    try:
+        service.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.server.server_close()
@@ -0,0 +1,41 @@
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """
+    Coalesces identical calls in flight: while a call for a key runs, other callers asking for
+    the same key wait for it and get its result (or its exception) instead of making their own.
+
+    Nothing is kept once the call is done, caching results is the job of ResponseCache.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn) -> tuple:
+        """
+        Runs fn() for the key unless it is already running.
+
+        Returns:
+            tuple: (result, shared) where shared is True if the result came from another caller's call.
+        """
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self.lock:
+                del self.calls[key]
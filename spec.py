@@ -0,0 +1,263 @@
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from decimal import Decimal
+import mult
+from extract import Attribute, extract_attributes
+
+power_unit_patterns = r'W|w|Watt|watt'
+voltage_unit_patterns = r'V|v|Volt|volt'
+
+voltage_rating_field_name = "voltage"
+
+# the params given by the user, calculate_search_patterns adds its own keys next to them
+spec_fields = ('type', 'package', 'tolerance', 'power', voltage_rating_field_name, 'value', 'tempco', 'flags')
+
+def spec_hash(component_params : dict) -> str:
+    """
+    Returns a stable hash of the spec part of a params dict, the same before and after calculate_search_patterns.
+    """
+    spec = {key: component_params[key] for key in spec_fields if key in component_params}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
+@dataclass(frozen=True)
+class CompiledSpec:
+    """
+    Immutable matcher for a component spec, built once per spec.
+
+    It is built by `poc.calculate_search_patterns` from the params dict, and does what
+    `poc.clenup_description` used to do for every part. Numeric attributes are compared by value in
+    base SI units against the attributes found by `extract.extract_attributes`, which walks the
+    description only once. Each attribute is None when the spec does not have it.
+    """
+    value : str = None
+    value_si : Decimal = None
+    value_unit : str = None
+
+    power : str = None
+    power_si : Decimal = None
+    power_unit : str = None
+    better_power_rating : bool = False
+
+    voltage : str = None
+    voltage_si : Decimal = None
+    voltage_unit : str = None
+    better_voltage_rating : bool = False
+
+    tolerance : str = None
+    tolerance_si : Decimal = None
+
+    type : str = None
+    type_re : re.Pattern = None
+
+    package : str = None
+    package_re : re.Pattern = None
+
+    tempco : str = None
+    tempco_si : Decimal = None
+    tempco_unit : str = None
+    better_tempco : bool = False
+
+    @classmethod
+    def from_params(cls, component_params : dict) -> 'CompiledSpec':
+        """
+        Builds the matcher from a params dict already processed by `poc.calculate_search_patterns`.
+        """
+        flags = component_params.get('flags') or {}
+        fields = {}
+
+        #the first number variant is always the plain decimal in the standard unit
+        def standard_value(name):
+            return mult.convert_to_decimal(component_params[f'{name}_number_variants'][0][0])
+
+        if 'value' in component_params:
+            fields['value'] = component_params['value']
+            fields['value_si'] = standard_value('value')
+            fields['value_unit'] = value_units.get(component_params.get('type'))
+
+        if 'power' in component_params:
+            fields['power'] = component_params['power']
+            fields['power_si'] = standard_value('power')
+            fields['power_unit'] = component_params['power_unit']
+            fields['better_power_rating'] = flags.get('better_power_rating', False)
+
+        if voltage_rating_field_name in component_params:
+            fields['voltage'] = component_params[voltage_rating_field_name]
+            fields['voltage_si'] = standard_value('voltage')
+            fields['voltage_unit'] = component_params['voltage_unit']
+            fields['better_voltage_rating'] = flags.get('better_voltage_rating', False)
+
+        if 'tolerance' in component_params:
+            fields['tolerance'] = component_params['tolerance']
+            fields['tolerance_si'] = standard_value('tolerance')
+
+        if 'type' in component_params:
+            #only used when the type is not one the extractor knows
+            fields['type'] = component_params['type']
+            fields['type_re'] = re.compile(rf'\S*{re.escape(component_params["type"].lower())}\S*')
+
+        if 'package' in component_params:
+            #the regex pattern should be such as can have the pachage name within another
+            #word, for example, 0603 can be within a word like "0603SMD"
+            fields['package'] = component_params['package']
+            fields['package_re'] = re.compile(rf'\S*{re.escape(component_params["package"].lower())}\S*')
+
+        if 'tempco' in component_params:
+            fields['tempco'] = component_params['tempco']
+            fields['tempco_si'] = standard_value('tempco')
+            fields['tempco_unit'] = component_params['tempco_unit']
+            fields['better_tempco'] = flags.get('better_tempco', False)
+
+        return cls(**fields)
+
+    def match(self, description : str) -> tuple:
+        """
+        Cleans up a description and checks it against the spec.
+
+        The description is scanned once; every attribute of the spec must be found in it, and the
+        matching text is replaced with its standard format (for example "1 uF" with "1u").
+
+        Returns:
+            tuple: A tuple containing the cleaned up description and a boolean indicating whether the description is valid.
+        """
+        description, failed = self.check(description)
+        return description, failed is None
+
+    def check(self, description : str) -> tuple:
+        """
+        Same as match, but tells which attribute check failed.
+
+        Returns:
+            tuple: The cleaned up description and None if it is valid, or "" and the name of the attribute
+                (value, power, voltage, tolerance, type, package or tempco) that was not found or did not match.
+        """
+        text = description.replace(",", "")
+        found = {}
+        for attribute in extract_attributes(text):
+            found.setdefault(attribute.kind, []).append(attribute)
+
+        replacements = []
+
+        if self.value is not None:
+            attribute = _first(found.get('value'), lambda a: a.value == self.value_si and a.unit == self.value_unit)
+            if attribute is None:
+                return "", 'value'
+            replacements.append((attribute, self.value))
+
+        if self.power is not None:
+            if self.better_power_rating:
+                attribute = _first(found.get('power'), lambda a: a.value >= self.power_si)
+                if attribute is None:
+                    return "", 'power'
+                replacements.append((attribute, mult.format_decimal(attribute.value) + self.power_unit))
+            else:
+                attribute = _first(found.get('power'), lambda a: a.value == self.power_si)
+                if attribute is None:
+                    return "", 'power'
+                replacements.append((attribute, self.power))
+
+        if self.voltage is not None:
+            if self.better_voltage_rating:
+                attribute = _first(found.get('voltage'), lambda a: a.value >= self.voltage_si)
+                if attribute is None:
+                    return "", 'voltage'
+                replacements.append((attribute, mult.format_decimal(attribute.value) + self.voltage_unit))
+            else:
+                attribute = _first(found.get('voltage'), lambda a: a.value == self.voltage_si)
+                if attribute is None:
+                    return "", 'voltage'
+                replacements.append((attribute, self.voltage))
+
+        if self.tolerance is not None:
+            attribute = _first(found.get('tolerance'), lambda a: a.value == self.tolerance_si)
+            if attribute is None:
+                return "", 'tolerance'
+            replacements.append((attribute, self.tolerance))
+
+        if self.type is not None:
+            attribute = _word(text, found.get('type'), self.type, self.type_re)
+            if attribute is None:
+                return "", 'type'
+            replacements.append((attribute, self.type))
+
+        if self.package is not None:
+            attribute = _word(text, found.get('package'), self.package, self.package_re)
+            if attribute is None:
+                return "", 'package'
+            replacements.append((attribute, self.package))
+
+        if self.tempco is not None:
+            if self.better_tempco:
+                attribute = _first(found.get('tempco'), lambda a: a.value <= self.tempco_si)
+                if attribute is None:
+                    return "", 'tempco'
+                replacements.append((attribute, attribute.number + self.tempco_unit))
+            else:
+                attribute = _first(found.get('tempco'), lambda a: a.value == self.tempco_si)
+                if attribute is None:
+                    return "", 'tempco'
+                replacements.append((attribute, self.tempco))
+
+        #build the cleaned up description in one go, from the spans
+        out = []
+        position = 0
+        for attribute, standard in sorted(replacements, key=lambda r: r[0].start):
+            if attribute.start < position:
+                continue
+            out.append(text[position:attribute.start].lower())
+            out.append(standard)
+            position = attribute.end
+        out.append(text[position:].lower())
+
+        return "".join(out), None
+
+    def filter(self, descriptions) -> list:
+        """
+        Matches a batch of descriptions.
+
+        Returns:
+            list: The cleaned up description for every accepted description, None for the rejected ones, in the same order.
+        """
+        check = self.check
+        out = []
+        for description in descriptions:
+            cleaned, failed = check(description or "")
+            out.append(cleaned if failed is None else None)
+        return out
+
+    def check_all(self, descriptions) -> list:
+        """
+        Checks a batch of descriptions.
+
+        Returns:
+            list: A (cleaned up description, failed attribute) tuple per description, see check.
+        """
+        check = self.check
+        return [check(description or "") for description in descriptions]
+
+# standard unit of the value of each component type
+value_units = {
+    'resistor': 'Ω',
+    'capacitor': 'F',
+    'inductor': 'H',
+}
+
+def _first(attributes : list, accept):
+    for attribute in attributes or []:
+        if accept(attribute):
+            return attribute
+    return None
+
+def _word(text : str, attributes : list, word : str, pattern : re.Pattern):
+    """
+    Finds the type or package word among the extracted attributes, or with its own regex if the extractor does not know it.
+    """
+    word = word.lower()
+    for attribute in attributes or []:
+        if word in attribute.text.lower():
+            return attribute
+    match = pattern.search(text.lower())
+    if match:
+        return Attribute('word', match.start(), match.end(), match.group(0))
+    return None
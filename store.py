@@ -0,0 +1,255 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+default_store_path = 'parts.db'
+
+class PartStore:
+    """
+    Indexed local store of the parts returned by the Mouser API.
+
+    Parts are kept in a SQLite file, one row per ManufacturerPartNumber + Manufacturer, so fetching
+    the same part again updates its row instead of adding a duplicate. Each row keeps the raw part
+    JSON, when it was first and last seen, and the Category, which is indexed. Availability and
+    PriceBreaks are also kept in their own columns, with the time they were last updated.
+
+    Args:
+        path (str): The SQLite file used to persist the parts.
+    """
+    def __init__(self, path : str = default_store_path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS parts (
+                mpn TEXT NOT NULL,
+                manufacturer TEXT NOT NULL,
+                category TEXT,
+                description TEXT,
+                data TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                availability TEXT,
+                price_breaks TEXT,
+                pricing_updated REAL,
+                PRIMARY KEY (mpn, manufacturer)
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS parts_category ON parts(category)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS parts_pricing_updated ON parts(pricing_updated)")
+        self.conn.commit()
+
+    @staticmethod
+    def _row(part : dict, seen : float, priced : bool) -> tuple:
+        price_breaks = part.get("PriceBreaks")
+        #only a part that came with its PriceBreaks has its pricing updated
+        pricing_updated = seen if priced and price_breaks is not None else None
+        return (part.get("ManufacturerPartNumber") or "", part.get("Manufacturer") or "", part.get("Category"),
+                part.get("Description"), json.dumps(part), seen, seen,
+                part.get("Availability"), None if price_breaks is None else json.dumps(price_breaks), pricing_updated)
+
+    def upsert_parts(self, parts : list, seen : float = None, priced : bool = True) -> int:
+        """
+        Inserts the parts, or updates them if they are already stored. Returns the number of parts written.
+
+        `seen` is when the parts were fetched (now by default, the time of the dump for imports). A
+        stored part is only overwritten by a newer version of it: importing an old dump adds the
+        parts that are missing and moves first_seen back, but does not replace newer data.
+
+        With `priced` (parts fresh from the API) the Availability and PriceBreaks are dated `seen`.
+        Without it (imported dumps) their pricing_updated is left unknown, so they count as stale,
+        and they never replace pricing with a known date.
+        """
+        seen = time.time() if seen is None else seen
+        rows = [self._row(part, seen, priced) for part in parts if part.get("ManufacturerPartNumber")]
+        #dated pricing wins over older or undated pricing; between undated ones, the newer part wins
+        newer_pricing = """(excluded.pricing_updated >= IFNULL(parts.pricing_updated, 0)
+                            OR (excluded.pricing_updated IS NULL AND parts.pricing_updated IS NULL AND excluded.last_seen >= parts.last_seen))"""
+        with self.lock:
+            self.conn.executemany("""
+                INSERT INTO parts (mpn, manufacturer, category, description, data, first_seen, last_seen,
+                                   availability, price_breaks, pricing_updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (mpn, manufacturer) DO UPDATE SET
+                    category = CASE WHEN excluded.last_seen >= parts.last_seen THEN excluded.category ELSE parts.category END,
+                    description = CASE WHEN excluded.last_seen >= parts.last_seen THEN excluded.description ELSE parts.description END,
+                    data = CASE WHEN excluded.last_seen >= parts.last_seen THEN excluded.data ELSE parts.data END,
+                    first_seen = MIN(parts.first_seen, excluded.first_seen),
+                    last_seen = MAX(parts.last_seen, excluded.last_seen),
+                    availability = CASE WHEN {newer_pricing} THEN excluded.availability ELSE parts.availability END,
+                    price_breaks = CASE WHEN {newer_pricing} THEN excluded.price_breaks ELSE parts.price_breaks END,
+                    pricing_updated = CASE WHEN {newer_pricing} THEN excluded.pricing_updated ELSE parts.pricing_updated END
+                """.format(newer_pricing=newer_pricing), rows)
+            self.conn.commit()
+        return len(rows)
+
+    def import_jsonl(self, path : str, batch_size : int = 5000, seen : float = None) -> int:
+        """
+        Bulk imports a file with one part JSON per line, as the old data_global.txt dumps.
+
+        The parts are taken as seen at `seen`, by default the modification time of the file, so an
+        old dump does not overwrite parts fetched after it. Their pricing is left undated, so
+        refresh_pricing updates it. Malformed lines are skipped. Returns the number of lines imported.
+        """
+        seen = os.path.getmtime(path) if seen is None else seen
+        total = 0
+        batch = []
+        for part in iter_jsonl_parts(path):
+            batch.append(part)
+            if len(batch) >= batch_size:
+                total += self.upsert_parts(batch, seen, priced=False)
+                batch = []
+        if batch:
+            total += self.upsert_parts(batch, seen, priced=False)
+        return total
+
+    def get(self, mpn : str, manufacturer : str = None) -> list:
+        """
+        Returns the stored parts with the given ManufacturerPartNumber, optionally of a given Manufacturer.
+        """
+        if manufacturer is None:
+            rows = self.conn.execute("SELECT data FROM parts WHERE mpn = ?", (mpn,))
+        else:
+            rows = self.conn.execute("SELECT data FROM parts WHERE mpn = ? AND manufacturer = ?", (mpn, manufacturer))
+        return [json.loads(row[0]) for row in rows]
+
+    def last_seen(self, mpn : str, manufacturer : str) -> float:
+        row = self.conn.execute("SELECT last_seen FROM parts WHERE mpn = ? AND manufacturer = ?", (mpn, manufacturer)).fetchone()
+        return row[0] if row else None
+
+    def pricing(self, mpn : str, manufacturer : str) -> tuple:
+        """
+        Returns (Availability, PriceBreaks, updated) of a part, or None if it is not stored.
+        """
+        row = self.conn.execute("SELECT availability, price_breaks, pricing_updated FROM parts WHERE mpn = ? AND manufacturer = ?",
+                                (mpn, manufacturer)).fetchone()
+        if row is None:
+            return None
+        return row[0], None if row[1] is None else json.loads(row[1]), row[2]
+
+    def stale_parts(self, max_age : float, mpns : list = None) -> list:
+        """
+        Returns the (mpn, manufacturer) of the parts whose pricing is older than max_age seconds,
+        the oldest first. With `mpns` only those part numbers are considered (a watched BOM).
+        """
+        query = "SELECT mpn, manufacturer FROM parts WHERE IFNULL(pricing_updated, 0) < ?"
+        args = [time.time() - max_age]
+        if mpns is not None:
+            mpns = list(mpns)
+            if not mpns:
+                return []
+            query += f" AND mpn IN ({','.join('?' * len(mpns))})"
+            args.extend(mpns)
+        query += " ORDER BY IFNULL(pricing_updated, 0)"
+        return [tuple(row) for row in self.conn.execute(query, args)]
+
+    def iter_parts(self, category : str = None, contains : list = None):
+        """
+        Yields the stored parts, optionally only the ones of a Category.
+
+        `contains` is a list of words that must all be in the Description (case insensitive),
+        so the caller can skip decoding parts that can not match.
+        """
+        query = "SELECT data FROM parts"
+        conditions = []
+        args = []
+        if category is not None:
+            conditions.append("category = ?")
+            args.append(category)
+        for word in contains or []:
+            conditions.append("description LIKE ?")
+            args.append(f"%{word}%")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        for row in self.conn.execute(query, args):
+            yield json.loads(row[0])
+
+    def descriptions(self) -> tuple:
+        """
+        Returns the rowids and the Descriptions of all the stored parts, in rowid order, see parts_by_rowid.
+        """
+        rows = self.conn.execute("SELECT rowid, description FROM parts ORDER BY rowid").fetchall()
+        return [row[0] for row in rows], [row[1] for row in rows]
+
+    def parts_by_rowid(self, rowids : list) -> list:
+        """
+        Returns the stored parts with the given rowids, in the same order.
+        """
+        found = {}
+        rowids = [int(rowid) for rowid in rowids]
+        #in batches, SQLite limits the number of parameters of a query
+        for start in range(0, len(rowids), 500):
+            batch = rowids[start:start + 500]
+            query = f"SELECT rowid, data FROM parts WHERE rowid IN ({','.join('?' * len(batch))})"
+            found.update((rowid, json.loads(data)) for rowid, data in self.conn.execute(query, batch))
+        return [found[rowid] for rowid in rowids if rowid in found]
+
+    def version(self) -> tuple:
+        """
+        Returns a value that changes when parts are added or updated, to know when what was built from the store is outdated.
+        """
+        return tuple(self.conn.execute("SELECT COUNT(*), MAX(rowid), MAX(last_seen) FROM parts").fetchone())
+
+    def categories(self) -> list:
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT category FROM parts ORDER BY category")]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM parts").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+def iter_jsonl_parts(path : str):
+    """
+    Yields the parts of a file with one part JSON per line, as the old data_global.txt dumps.
+    """
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+def jsonl_descriptions(path : str) -> tuple:
+    """
+    Returns the byte offsets and the Descriptions of the parts of a JSON lines dump, see read_jsonl_parts.
+    """
+    offsets = []
+    descriptions = []
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            try:
+                part = json.loads(line)
+            except json.JSONDecodeError:
+                part = None
+            if isinstance(part, dict):
+                offsets.append(offset)
+                descriptions.append(part.get("Description"))
+            offset += len(line)
+    return offsets, descriptions
+
+def read_jsonl_parts(path : str, offsets : list) -> list:
+    """
+    Returns the parts at the given byte offsets of a JSON lines dump, in the same order.
+    """
+    parts = []
+    with open(path, 'rb') as f:
+        for offset in offsets:
+            f.seek(int(offset))
+            parts.append(json.loads(f.readline()))
+    return parts
+
+#main
+if __name__ == "__main__":
+    #import old data_global.txt dumps: python store.py data_global.txt [more files...]
+    import sys
+    store = PartStore()
+    for path in sys.argv[1:]:
+        print(f"{path}: {store.import_jsonl(path)} lines imported")
+    print(f"{store.count()} parts in {store.path}")
@@ -0,0 +1,333 @@
+import re
+import numpy as np
+from extract import extract_attributes, type_words, package_codes
+from spec import value_units
+
+numeric_columns = ['value', 'power', 'voltage', 'tolerance', 'tempco']
+
+# codes of the unit of the value column, 0 is no unit
+value_unit_codes = {'': 0, 'Ω': 1, 'F': 2, 'H': 3}
+
+class AttributeTable:
+    """
+    Columnar table of the attributes of a corpus of part descriptions.
+
+    Every description is parsed once with `extract.extract_attributes`. The first attribute of each
+    kind goes into a float64 column in base SI units (NaN when the description does not have it),
+    and every attribute of the kind into a 2D array (one row per description, NaN padded), as a
+    description can have several (e.g. "rated 1/16W pulse 1/8W"). Specs are then checked with
+    NumPy comparisons over whole columns, instead of part by part, with the same result as
+    CompiledSpec.check: a numeric attribute matches if any of the values of the description does,
+    and the type and package words are searched in the lowercased descriptions.
+
+    Attributes:
+        columns (dict): float64 array of the first value per numeric column (value, power, voltage, tolerance, tempco).
+        missing (dict): bool array per numeric column, True where the description does not have it.
+        value_unit (ndarray): int8 unit code of the value column, see value_unit_codes.
+        package (ndarray): int32 code of the package word, -1 if none. See packages.
+        type (ndarray): int32 code of the type word, -1 if none. See types.
+        all_values (dict): float64 2D array per numeric column with all the values of every description.
+        all_value_units (ndarray): int8 2D array of the unit codes of all_values['value'].
+        text (str): The lowercased descriptions (without commas, as CompiledSpec.check sees them), one per line.
+        offsets (ndarray): int64 start of every description in text.
+    """
+    def __init__(self, columns : dict, value_unit, package, packages : list, type_, types : list,
+                 all_values : dict, all_value_units, text : str, offsets):
+        self.columns = columns
+        self.missing = {name: np.isnan(column) for name, column in columns.items()}
+        self.value_unit = value_unit
+        self.package = package
+        self.packages = packages
+        self.type = type_
+        self.types = types
+        self.all_values = all_values
+        self.all_value_units = all_value_units
+        self.text = text
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.value_unit)
+
+    @classmethod
+    def from_descriptions(cls, descriptions) -> 'AttributeTable':
+        values = {name: [] for name in numeric_columns}
+        value_units = []
+        package_words = []
+        type_words = []
+        texts = []
+
+        for description in descriptions:
+            text = (description or "").replace(",", "")
+            texts.append(text.lower())
+            row = {}
+            for attribute in extract_attributes(text):
+                row.setdefault(attribute.kind, []).append(attribute)
+
+            for name in numeric_columns:
+                values[name].append([float(attribute.value) for attribute in row.get(name, ())])
+            value_units.append([value_unit_codes.get(attribute.unit, 0) for attribute in row.get('value', ())])
+            package_words.append(row['package'][0].text.lower() if 'package' in row else None)
+            type_words.append(row['type'][0].text.lower() if 'type' in row else None)
+
+        package, packages = _codes(package_words)
+        type_, types = _codes(type_words)
+
+        all_values = {name: _padded(rows, np.nan, np.float64) for name, rows in values.items()}
+        all_value_units = _padded(value_units, 0, np.int8)
+        columns = {name: array[:, 0].copy() for name, array in all_values.items()}
+
+        offsets = np.zeros(len(texts), dtype=np.int64)
+        if texts:
+            offsets[1:] = np.cumsum([len(text) + 1 for text in texts[:-1]])
+
+        return cls(columns, all_value_units[:, 0].copy(), package, packages, type_, types,
+                   all_values, all_value_units, "\n".join(texts), offsets)
+
+    @classmethod
+    def from_parts(cls, parts) -> 'AttributeTable':
+        return cls.from_descriptions(part.get("Description") for part in parts)
+
+    def compare(self, column : str, op : str, target : float, tolerance : float = None):
+        """
+        Returns a bool mask of the rows where `column op target`. Missing values never match.
+
+        Args:
+            column (str): One of the numeric columns.
+            op (str): 'eq', 'ge', 'le' or 'within'.
+            target (float): Value to compare with, in base SI units.
+            tolerance (float): For 'within', the allowed relative deviation, e.g. 0.05 for ±5%.
+        """
+        data = self.columns[column]
+        with np.errstate(invalid='ignore'):
+            if op == 'eq':
+                mask = np.isclose(data, target, rtol=1e-9, atol=0)
+            elif op == 'ge':
+                mask = data >= target * (1 - 1e-9)
+            elif op == 'le':
+                mask = data <= target * (1 + 1e-9)
+            elif op == 'within':
+                mask = np.abs(data - target) <= abs(target) * tolerance
+            else:
+                raise ValueError(f"Invalid comparison '{op}'")
+        return mask & ~self.missing[column]
+
+    def word_mask(self, codes : np.ndarray, words : list, word : str):
+        #the word may be part of the description word, like 0603 in 0603smd
+        word = word.lower()
+        matching = [code for code, text in enumerate(words) if word in text]
+        return np.isin(codes, matching)
+
+    def text_mask(self, word : str):
+        """
+        Returns a bool mask of the rows whose description has `word` (case insensitive), in a word or within one like 0603 in 0603smd.
+        """
+        word = word.lower()
+        if not word:
+            return np.ones(len(self), dtype=bool)
+        mask = np.zeros(len(self), dtype=bool)
+        #one search over all the descriptions, each match is mapped back to its row
+        starts = [match.start() for match in re.finditer(re.escape(word), self.text)]
+        mask[np.searchsorted(self.offsets, starts, side='right') - 1] = True
+        return mask
+
+    def any_value(self, column : str, op : str, target : float, unit : int = None):
+        """
+        Returns a bool mask of the rows with at least one value of `column` that is `op` ('eq', 'ge' or 'le') target.
+
+        The comparisons are exact, as the ones of CompiledSpec.check. With `unit`, the value must also have that unit code.
+        """
+        data = self.all_values[column]
+        with np.errstate(invalid='ignore'):
+            if op == 'eq':
+                found = data == target
+            elif op == 'ge':
+                found = data >= target
+            elif op == 'le':
+                found = data <= target
+            else:
+                raise ValueError(f"Invalid comparison '{op}'")
+        if unit is not None:
+            found &= self.all_value_units == unit
+        return found.any(axis=1)
+
+    def spec_mask(self, compiled_spec):
+        """
+        Returns a bool mask of the rows accepted by a CompiledSpec, evaluated over whole columns.
+
+        It accepts the same rows as CompiledSpec.check, so check only has to run on them to get the cleaned up descriptions.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        spec = compiled_spec
+
+        if spec.value is not None:
+            mask &= self.any_value('value', 'eq', float(spec.value_si), value_unit_codes.get(spec.value_unit, 0))
+        if spec.power is not None:
+            mask &= self.any_value('power', 'ge' if spec.better_power_rating else 'eq', float(spec.power_si))
+        if spec.voltage is not None:
+            mask &= self.any_value('voltage', 'ge' if spec.better_voltage_rating else 'eq', float(spec.voltage_si))
+        if spec.tolerance is not None:
+            mask &= self.any_value('tolerance', 'eq', float(spec.tolerance_si))
+        if spec.tempco is not None:
+            mask &= self.any_value('tempco', 'le' if spec.better_tempco else 'eq', float(spec.tempco_si))
+        if spec.type is not None:
+            mask &= self.text_mask(spec.type)
+        if spec.package is not None:
+            mask &= self.text_mask(spec.package)
+
+        return mask
+
+    def save(self, path : str):
+        np.savez(path, value_unit=self.value_unit, package=self.package, packages=np.array(self.packages, dtype=str),
+                 type=self.type, types=np.array(self.types, dtype=str), all_value_units=self.all_value_units,
+                 text=np.array(self.text, dtype=str), offsets=self.offsets,
+                 **self.columns, **{f"all_{name}": array for name, array in self.all_values.items()})
+
+    @classmethod
+    def load(cls, path : str) -> 'AttributeTable':
+        data = np.load(path)
+        return cls({name: data[name] for name in numeric_columns}, data['value_unit'],
+                   data['package'], list(data['packages']), data['type'], list(data['types']),
+                   {name: data[f"all_{name}"] for name in numeric_columns}, data['all_value_units'],
+                   str(data['text']), data['offsets'])
+
+class ValueIndex:
+    """
+    Sorted index of the numeric columns of an AttributeTable, per (type, package).
+
+    For every (type, package) group and column, the rows with a value are kept sorted by value (built
+    on first use), so range queries and nearest value searches are binary searches instead of a scan
+    of the whole table. It is how drop-in alternates are found for a part out of stock:
+
+        index.query('resistor', '0603', value=around(2700, 0.05), power=(0.1, None))
+        index.nearest('resistor', '0603', 'value', 2700, k=5, power=(0.1, None))
+
+    Types and packages are matched by their canonical word ("resistors" is "resistor", "0603smd" is
+    "0603"). Values are in base SI units, and the value column only has the rows with the unit of the type.
+    Queries return row numbers of the table (and of `parts`, if given).
+
+    Args:
+        table (AttributeTable): The table to index.
+        parts (list): Optional parts the table was built from, see parts_of.
+    """
+    def __init__(self, table : AttributeTable, parts : list = None):
+        self.table = table
+        self.parts = parts
+        self.sorted = {}
+
+        type_keys = [_canonical(word, type_words) for word in table.types] + [None]
+        package_keys = [_canonical(word, package_codes) for word in table.packages] + [None]
+        groups = {}
+        # code -1 (no word) is the None at the end of the key lists
+        for row, (type_code, package_code) in enumerate(zip(table.type.tolist(), table.package.tolist())):
+            groups.setdefault((type_keys[type_code], package_keys[package_code]), []).append(row)
+        self.groups = {key: np.array(rows, dtype=np.int64) for key, rows in groups.items()}
+
+    def _sorted(self, type : str, package : str, column : str) -> tuple:
+        """
+        Returns (values, rows) of a group and column, sorted by value.
+        """
+        type, package = _canonical(type, type_words), _canonical(package, package_codes)
+        key = (type, package, column)
+        found = self.sorted.get(key)
+        if found is None:
+            rows = self.groups.get((type, package), np.array([], dtype=np.int64))
+            rows = rows[~self.table.missing[column][rows]]
+            if column == 'value' and type in value_units:
+                rows = rows[self.table.value_unit[rows] == value_unit_codes[value_units[type]]]
+            values = self.table.columns[column][rows]
+            order = np.argsort(values, kind='stable')
+            found = self.sorted[key] = (values[order], rows[order])
+        return found
+
+    def range(self, type : str, package : str, column : str, low : float = None, high : float = None) -> np.ndarray:
+        """
+        Returns the rows of a group with low <= column <= high (None for no bound), sorted by value.
+        """
+        values, rows = self._sorted(type, package, column)
+        start = 0 if low is None else np.searchsorted(values, low * (1 - 1e-9), side='left')
+        end = len(values) if high is None else np.searchsorted(values, high * (1 + 1e-9), side='right')
+        return rows[start:end]
+
+    def _accepts(self, rows : np.ndarray, ranges : dict) -> np.ndarray:
+        mask = np.ones(len(rows), dtype=bool)
+        for column, (low, high) in ranges.items():
+            data = self.table.columns[column][rows]
+            mask &= ~self.table.missing[column][rows]
+            with np.errstate(invalid='ignore'):
+                if low is not None:
+                    mask &= data >= low * (1 - 1e-9)
+                if high is not None:
+                    mask &= data <= high * (1 + 1e-9)
+        return mask
+
+    def query(self, type : str, package : str, **ranges) -> np.ndarray:
+        """
+        Returns the rows of a group within all the (low, high) ranges given by column, sorted by the first one.
+
+        The first range is a binary search, the others are checked only on its rows.
+        """
+        if not ranges:
+            raise ValueError("At least one column range is needed")
+        (column, (low, high)), *others = ranges.items()
+        rows = self.range(type, package, column, low, high)
+        return rows[self._accepts(rows, dict(others))]
+
+    def nearest(self, type : str, package : str, column : str, target : float, k : int = 5, **ranges) -> np.ndarray:
+        """
+        Returns up to k rows of a group with the column closest to target, the closest first,
+        among the rows within the (low, high) ranges given for other columns.
+        """
+        values, rows = self._sorted(type, package, column)
+        accepted = self._accepts(rows, ranges) if ranges else np.ones(len(rows), dtype=bool)
+        #walk away from the insertion point on both sides
+        right = int(np.searchsorted(values, target))
+        left = right - 1
+        found = []
+        while len(found) < k and (left >= 0 or right < len(values)):
+            if right >= len(values) or (left >= 0 and target - values[left] <= values[right] - target):
+                if accepted[left]:
+                    found.append(rows[left])
+                left -= 1
+            else:
+                if accepted[right]:
+                    found.append(rows[right])
+                right += 1
+        return np.array(found, dtype=np.int64)
+
+    def parts_of(self, rows) -> list:
+        return [self.parts[row] for row in rows]
+
+def around(target : float, tolerance : float) -> tuple:
+    """
+    The (low, high) range of target ± a relative tolerance, e.g. around(2700, 0.05) for 2k7 ±5%.
+    """
+    return target * (1 - tolerance), target * (1 + tolerance)
+
+def _canonical(word : str, vocabulary : list) -> str:
+    """
+    The vocabulary word in a type/package word ("resistors" -> "resistor", "0603smd" -> "0603"), or the word itself.
+    """
+    if word is None:
+        return None
+    word = word.lower()
+    for known in vocabulary:
+        if known in word:
+            return known
+    return word
+
+def _padded(rows : list, fill, dtype) -> np.ndarray:
+    """
+    Returns the lists of values as a 2D array, one row per list, padded with `fill` (at least one column).
+    """
+    array = np.full((len(rows), max((len(row) for row in rows), default=0) or 1), fill, dtype=dtype)
+    for i, row in enumerate(rows):
+        array[i, :len(row)] = row
+    return array
+
+def _codes(words : list) -> tuple:
+    """
+    Returns the int32 code of each word (-1 for None) and the list of distinct words.
+    """
+    distinct = sorted({word for word in words if word is not None})
+    index = {word: code for code, word in enumerate(distinct)}
+    return np.array([index.get(word, -1) for word in words], dtype=np.int32), distinct
@@ -0,0 +1,25 @@
+import bom
+import poc
+
+resistor = {"type": "resistor", "package": "0603", "tolerance": "1%", "power": "1/10W", "value": "2K7"}
+capacitor = {"type": "capacitor", "package": "0603", "tolerance": "20%", "voltage": "50V", "value": "1u"}
+
+def fake_search_component(api_key, keyword, records_per_request, starting_record, cache=None, refresh=False):
+    parts = [
+        {"Description": "Thick Film Resistors - SMD 0603 2.7Kohm 1% 1/10W 100ppm", "Manufacturer": "M", "ManufacturerPartNumber": "R1"},
+        {"Description": "Multilayer Ceramic Capacitors MLCC - SMD/SMT 0603 50V 1uF X7R 20%", "Manufacturer": "M", "ManufacturerPartNumber": "C1"},
+    ]
+    return {"SearchResults": {"NumberOfResult": len(parts), "Parts": parts}}
+
+def test_bad_line_is_unresolved(monkeypatch):
+    monkeypatch.setattr(poc, "search_component", fake_search_component)
+    #no tolerance
+    bad = {"type": "capacitor", "package": "0603", "voltage": "50V", "value": "1u"}
+
+    results, errors = bom.resolve_bom("key", [resistor, bad, capacitor], 1, ["ManufacturerPartNumber"])
+
+    assert errors[0] is None and errors[2] is None
+    assert "tolerance" in errors[1]
+    assert results[1] == []
+    assert [record["ManufacturerPartNumber"] for record in results[0]] == ["R1"]
+    assert [record["ManufacturerPartNumber"] for record in results[2]] == ["C1"]
@@ -0,0 +1,94 @@
+import os
+import pytest
+import ratelimit
+from ratelimit import QuotaExceeded, QuotaLimiter, SharedQuotaLimiter
+
+class Clock:
+    """
+    Stands in for time.time and time.monotonic, moved by hand.
+    """
+    def __init__(self, now : float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, "time", clock)
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    return clock
+
+def booked_times(limiter, clock, calls : int) -> list:
+    """
+    Reserves `calls` calls, moving the clock a bit between them, and returns when each one is made.
+    """
+    times = []
+    for i in range(calls):
+        times.append(clock.now + limiter.reserve())
+        clock.now += 0.1 * (i % 7)
+    return times
+
+def assert_per_minute(times : list, per_minute : int):
+    times = sorted(times)
+    for first, last in zip(times, times[per_minute:]):
+        assert last - first >= 60
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_minute_limit_holds_in_every_window(clock, tmp_path, shared):
+    if shared:
+        limiter = SharedQuotaLimiter(str(tmp_path / "quota.db"), per_minute=60, per_day=10 ** 6, max_wait=10 ** 6)
+    else:
+        limiter = QuotaLimiter(per_minute=60, per_day=10 ** 6, max_wait=10 ** 6, path=None)
+
+    times = booked_times(limiter, clock, 300)
+
+    assert_per_minute(times, 60)
+    #the first minute is not wasted either
+    assert times[59] - times[0] == pytest.approx(sum(0.1 * (i % 7) for i in range(59)))
+
+def test_minute_limit_is_shared_between_processes(clock, tmp_path):
+    path = str(tmp_path / "quota.db")
+    workers = [SharedQuotaLimiter(path, per_minute=30, per_day=10 ** 6, max_wait=10 ** 6) for _ in range(3)]
+
+    times = []
+    for i in range(90):
+        times.append(clock.now + workers[i % 3].reserve())
+        clock.now += 0.5
+
+    assert_per_minute(times, 30)
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_day_limit_raises_once_spent_and_persists(clock, tmp_path, shared):
+    def make():
+        if shared:
+            return SharedQuotaLimiter(str(tmp_path / "quota.db"), per_minute=10 ** 6, per_day=5)
+        return QuotaLimiter(per_minute=10 ** 6, per_day=5, path=str(tmp_path / "calls.json"))
+
+    #midday UTC
+    clock.now = 1_700_000_000.0 - 1_700_000_000.0 % ratelimit.seconds_per_day + 12 * 3600
+    limiter = make()
+    for _ in range(5):
+        assert limiter.reserve() == 0
+    assert limiter.remaining()[1] == 0
+
+    with pytest.raises(QuotaExceeded) as raised:
+        limiter.reserve()
+    assert raised.value.wait == 12 * 3600
+
+    #a new run the same day does not get a new quota
+    with pytest.raises(QuotaExceeded):
+        make().reserve()
+
+    #the quota starts over at midnight UTC
+    clock.now += 12 * 3600
+    assert make().reserve() == 0
+
+def test_day_limit_in_memory(clock):
+    limiter = QuotaLimiter(per_minute=10 ** 6, per_day=2, path=None)
+    limiter.reserve()
+    limiter.reserve()
+    with pytest.raises(QuotaExceeded):
+        limiter.reserve()
+    assert not os.path.exists(ratelimit.default_calls_path)
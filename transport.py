@@ -0,0 +1,159 @@
+import random
+import time
+from lazy import lazy_import
+from ratelimit import QuotaExceeded
+
+# only imported when the first call is made
+requests = lazy_import("requests")
+
+# statuses worth trying again: throttled, or a transient server error
+retry_statuses = (429, 500, 502, 503, 504)
+
+class CircuitOpen(QuotaExceeded):
+    """
+    Raised without calling the API while the daily quota is known to be spent.
+    """
+
+def retry_after(response) -> float:
+    """
+    Returns the seconds asked by the Retry-After header (in seconds or as an HTTP date), or None.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def wire_bytes(response) -> int:
+    """
+    Returns the size of a response body as it came over the network (compressed, as asked with Accept-Encoding).
+
+    The size is the count of bytes urllib3 pulled from the connection (response.raw.tell()), or
+    the Content-Length. urllib3 does not count chunked bodies and those have no Content-Length,
+    so for them it falls back to the decoded size.
+    """
+    #the body was already read by requests, without stream=True
+    read = response.raw.tell() if response.raw is not None else 0
+    if read > 0:
+        return read
+    try:
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return len(response.content)
+
+class Transport:
+    """
+    HTTP transport of the API calls.
+
+    All calls share one session, so connections are kept alive and pooled, and responses are
+    asked gzip compressed. Throttled (429) and transient (5xx) responses, and connection errors,
+    are tried again after the Retry-After the server asked for or, without it, after a jittered
+    exponential backoff. Every attempt acquires a token from the limiter.
+
+    When the daily quota is spent (the limiter, or a Retry-After, would make us wait more than
+    the limiter's max_wait) the circuit opens: calls raise CircuitOpen right away, without
+    touching the API, until the quota is back.
+
+    Args:
+        metrics (Metrics): Where the latency, calls, bytes and retries are recorded.
+        max_retries (int): Attempts after the first one before giving up.
+        backoff (float): Base of the exponential backoff, in seconds.
+        max_backoff (float): Longest backoff between two attempts, in seconds.
+        timeout (float): Timeout of every attempt, in seconds.
+        pool_maxsize (int): Connections kept alive per host.
+    """
+    def __init__(self, metrics, max_retries : int = 5, backoff : float = 1.0, max_backoff : float = 60.0, timeout : float = 30.0, pool_maxsize : int = 16):
+        self.metrics = metrics
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.open_until = 0.0
+        self._session = None
+
+    @property
+    def session(self):
+        """
+        The pooled session, created (and requests imported) on first use.
+        """
+        if self._session is None:
+            session = requests.Session()
+            session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize))
+            session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize))
+            session.headers.update({"Content-Type": "application/json", "Accept-Encoding": "gzip, deflate"})
+            self._session = session
+        return self._session
+
+    def backoff_time(self, attempt : int) -> float:
+        """
+        Full jitter: a random wait up to backoff * 2^attempt, so concurrent callers do not retry together.
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def open_circuit(self, wait : float):
+        self.open_until = max(self.open_until, time.monotonic() + wait)
+        self.metrics.inc("circuit_opened_total")
+
+    def post(self, url : str, payload : dict, limiter) -> dict:
+        """
+        Posts the payload and returns the decoded JSON response.
+
+        Raises:
+            HTTPError: If the call still fails after the retries, or fails with a status not worth retrying.
+            QuotaExceeded: If the daily quota is spent (CircuitOpen if it was already known).
+        """
+        now = time.monotonic()
+        if now < self.open_until:
+            raise CircuitOpen(self.open_until - now)
+
+        attempt = 0
+        while True:
+            try:
+                limiter.acquire()
+            except QuotaExceeded as e:
+                if e.wait > 0:
+                    self.open_circuit(e.wait)
+                raise
+
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.metrics.inc("http_retries_total", status="connection")
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self.backoff_time(attempt))
+                attempt += 1
+                continue
+
+            self.metrics.observe("http_request_seconds", time.perf_counter() - start, status=str(response.status_code))
+            self.metrics.inc("api_calls_total")
+            self.metrics.inc("bytes_downloaded_total", wire_bytes(response))
+
+            if response.status_code == 200:
+                return response.json()
+
+            if response.status_code in retry_statuses and attempt < self.max_retries:
+                wait = retry_after(response)
+                if wait is not None and wait > limiter.max_wait:
+                    #the server wants us back in hours, that is the daily quota
+                    self.open_circuit(wait)
+                    raise QuotaExceeded(wait)
+                if wait is None:
+                    wait = self.backoff_time(attempt)
+                self.metrics.inc("http_retries_total", status=str(response.status_code))
+                time.sleep(wait)
+                attempt += 1
+                continue
+
+            response.raise_for_status()
+            #not an error status, but not the expected one either
+            raise requests.exceptions.HTTPError(f"Unexpected status {response.status_code} for url: {url}", response=response)